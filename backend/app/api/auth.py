@@ -34,6 +34,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
+async def get_current_admin(current_user: User = Depends(get_current_user)):
+    """Like get_current_user, but only for the operators listed in ADMIN_EMAILS."""
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
 async def verify_token(token: str):
     """Verify a JWT token and return the user. Used by WebSocket endpoints."""
     try:
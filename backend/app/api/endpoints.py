@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, WebSocket, WebSocketDisconnect, Header, Query
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Dict, Optional, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.models import UserInput, User, AnalysisResult
-from app.api.auth import get_current_user
-from app.services.gemini_service import gemini_service
-from app.services.weather_service import weather_service
-from app.services.price_service import price_service
+from app.api.auth import get_current_admin, get_current_user, verify_token
 from app.services.prediction_service import prediction_service
 from app.services.sarvam_service import sarvam_service
+from app.services.translation_memory import translation_memory
+from app.services.history_writer import history_writer
+from app.services.model_router import model_router
+from app.services.resilience import provider_stats
 from app.services.chat_service import chat_service
+from app.services.tts_service import SpeechFailed, tts_service
+from app.services.tts_cache import tts_cache
+from app.services.audio_store import RangeNotSatisfiable, audio_store, parse_range
 from app.services.geocoding_service import geocoding_service
+from app.services.analysis_service import analysis_service
+from app.services.analysis_jobs import FINISHED, QueueFull, analysis_jobs, job_view
 from app.models import AnalysisResult, UserInput, ChatSession, AnalysisHistory
 from datetime import datetime
 import json
@@ -70,41 +76,8 @@ async def update_user_profile(
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
-@router.post("/analyze", response_model=AnalysisResult)
-async def analyze_crops(
-    user_input: UserInput,
-    current_user: User = Depends(get_current_user)
-):
-    # 1. Get Weather Data
-    weather_data = await weather_service.get_weather(user_input.location)
-    
-    # 2. Get Price Data & Forecast
-    price_data = await price_service.get_prices(user_input.location)
-    
-    # Try to get forecast for the first crop mentioned (simple heuristic)
-    forecast_info = ""
-    if user_input.previous_crops:
-        # This is a bit loose, ideally we'd parse the crop name better or ask user for target crop
-        # For now, let's just pass the raw input to Gemini and let it decide, 
-        # BUT we can also try to match a crop from our prediction service if possible.
-        # Let's check if any of our supported crops are in the input string
-        supported_crops = ["wheat", "rice", "paddy", "maize", "cotton", "soyabean", "sugarcane"] # etc
-        found_crop = None
-        for crop in supported_crops:
-            if crop in user_input.previous_crops.lower():
-                found_crop = crop if crop != "rice" else "paddy" # Map rice to paddy
-                break
-        
-        if found_crop:
-            forecast = prediction_service.get_forecast(found_crop)
-            if forecast:
-                forecast_info = f"\n**AI Price Forecast for {found_crop.capitalize()} (Next 6 Months):**\n"
-                for f in forecast:
-                    forecast_info += f"- {f['month']}: ₹{f['price']}\n"
-    
-    full_price_context = f"{price_data}\n{forecast_info}"
-
-    # Build user context for scheme recommendations
+def _user_context(current_user: User) -> Dict[str, Any]:
+    """Profile fields Gemini uses for scheme recommendations."""
     user_context = {
         "full_name": current_user.full_name or "",
         "age": current_user.age or 0,
@@ -112,107 +85,244 @@ async def analyze_crops(
         "caste_category": current_user.caste_category or "Not specified",
     }
     print(f"Analysis: User context for schemes - Gender: {user_context['gender']}, Caste: {user_context['caste_category']}")
+    return user_context
 
-    # 3. Analyze with Gemini (now includes user context for schemes)
-    gemini_response = await gemini_service.analyze_farm(user_input, weather_data, full_price_context, user_context)
-    
-    # 4. Parse Gemini Response (expecting JSON string)
-    try:
-        # Clean up json string if needed
-        cleaned_response = gemini_response.replace("```json", "").replace("```", "").strip()
-        analysis_result = json.loads(cleaned_response)
-        
-        # 5. Translate if needed (Sarvam AI)
-        print(f"Analysis: Language requested = '{user_input.language}'")
-        if user_input.language and user_input.language != "en-IN" and user_input.language != "en":
-            print(f"Analysis: Starting translation to {user_input.language}")
-            # Translate specific fields
-            # We translate the detailed advice and maybe weather analysis
-            # Translating the whole JSON structure is hard, so we translate values.
-            
-            # Translate Detailed Advice
-            translated_advice = await sarvam_service.translate(
-                analysis_result.get("detailed_advice", ""), 
-                user_input.language
-            )
-            analysis_result["detailed_advice"] = translated_advice
-            
-            # Translate Weather Analysis
-            translated_weather = await sarvam_service.translate(
-                analysis_result.get("weather_analysis", ""), 
-                user_input.language
-            )
-            analysis_result["weather_analysis"] = translated_weather
-            
-            # Translate Price Prediction text
-            translated_price = await sarvam_service.translate(
-                analysis_result.get("price_prediction", ""), 
-                user_input.language
-            )
-            analysis_result["price_prediction"] = translated_price
-
-            # Translate Soil Type
-            translated_soil = await sarvam_service.translate(
-                analysis_result.get("soil_type", ""), 
-                user_input.language
-            )
-            analysis_result["soil_type"] = translated_soil
-
-            # Translate Recommended Crops (List)
-            translated_crops = []
-            for crop in analysis_result.get("recommended_crops", []):
-                translated_crop = await sarvam_service.translate(crop, user_input.language)
-                translated_crops.append(translated_crop)
-            analysis_result["recommended_crops"] = translated_crops
-
-            # Translate Applicable Schemes
-            if analysis_result.get("applicable_schemes"):
-                translated_schemes = await sarvam_service.translate(
-                    analysis_result.get("applicable_schemes", ""), 
-                    user_input.language
-                )
-                analysis_result["applicable_schemes"] = translated_schemes
-
-        # Save to analysis history
-        try:
-            history_entry = AnalysisHistory(
-                user_email=current_user.email,
-                location=user_input.location,
-                land_size=user_input.land_size,
-                previous_crops=user_input.previous_crops,
-                soil_type=analysis_result.get("soil_type", ""),
-                recommended_crops=analysis_result.get("recommended_crops", []),
-                weather_analysis=analysis_result.get("weather_analysis", ""),
-                price_prediction=analysis_result.get("price_prediction", ""),
-                detailed_advice=analysis_result.get("detailed_advice", ""),
-                applicable_schemes=analysis_result.get("applicable_schemes", ""),
-                created_at=datetime.now()
-            )
-            await history_entry.save()
-            print(f"Analysis history saved successfully for {current_user.email}")
-        except Exception as e:
-            print(f"Error saving analysis history: {e}")
-            import traceback
-            traceback.print_exc()
+@router.post("/analyze", response_model=AnalysisResult)
+async def analyze_crops(
+    user_input: UserInput,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
+    # Build user context for scheme recommendations
+    user_context = _user_context(current_user)
 
-        return AnalysisResult(**analysis_result)
-    except json.JSONDecodeError:
+    # Weather, prices and forecast run concurrently, then Gemini, then translation.
+    # Identical recent or in-flight analyses are shared (X-Cache: HIT / COALESCED / MISS)
+    analysis_result, parsed, cache_status = await analysis_service.analyze_shared(user_input, user_context)
+    response.headers["X-Cache"] = cache_status
+    if not parsed:
         # Fallback if JSON parsing fails
-        return AnalysisResult(
-            soil_type="Analysis failed to parse",
-            recommended_crops=[],
-            weather_analysis="N/A",
-            price_prediction="N/A",
-            detailed_advice=gemini_response # Return raw text
-        )
+        return AnalysisResult(**analysis_result)
+
+    # Save to analysis history
+    analysis_service.save_history(current_user.email, user_input, analysis_result)
+
+    return AnalysisResult(**analysis_result)
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/analyze/stream")
+async def analyze_crops_stream(
+    user_input: UserInput,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    /analyze as Server-Sent Events: `progress` events as the context stages
+    settle, a `section` event per report field as soon as it is written (and
+    translated), then one `result` event carrying the AnalysisResult.
+    """
+    cache_key, shared_context = analysis_service.cache_key(user_input, _user_context(current_user))
+    cached = analysis_service.cached_result(cache_key)
+
+    async def events():
+        if cached is not None:
+            analysis_service.save_history(current_user.email, user_input, cached)
+            yield _sse("result", AnalysisResult(**cached).model_dump())
+            return
+
+        async for event, data in analysis_service.analyze_stream(user_input, shared_context):
+            if event == "result":
+                if data["parsed"]:
+                    analysis_service.store_result(cache_key, data["report"])
+                    analysis_service.save_history(current_user.email, user_input, data["report"])
+                data = AnalysisResult(**data["report"]).model_dump()
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must pass each event through as soon as it is written
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Cache": "HIT" if cached is not None else "MISS",
+        }
+    )
+
+# The prediction handlers are plain `def`: FastAPI runs them in its threadpool, so
+# model loads and sklearn calls never block the event loop
 
 @router.get("/crops")
-async def get_supported_crops():
+def get_supported_crops():
     return prediction_service.get_supported_crops()
 
+def _validate_quantiles(quantiles: List[float]) -> tuple:
+    if not all(0 < q < 1 for q in quantiles):
+        raise HTTPException(status_code=422, detail="Quantiles must be between 0 and 1")
+    return tuple(sorted(quantiles))
+
+class BatchForecastRequest(BaseModel):
+    crops: List[str] = []  # Empty list means every supported crop
+    horizon: int = Field(default=6, ge=1, le=60)  # Months ahead
+    ensemble: bool = False  # Median and bands from the bagged-tree ensemble
+    quantiles: Optional[List[float]] = None  # Bands for ensemble mode; defaults to settings
+
+@router.post("/predict/batch")
+def predict_crop_prices_batch(request: BatchForecastRequest):
+    """Forecast many crops over an arbitrary horizon in one response."""
+    crops = request.crops or prediction_service.get_supported_crops()
+    quantiles = None
+    if request.ensemble or request.quantiles:
+        quantiles = _validate_quantiles(request.quantiles or list(prediction_service.default_quantiles))
+    forecasts = prediction_service.get_forecasts(crops, request.horizon, quantiles=quantiles)
+    return {
+        "horizon": request.horizon,
+        "forecasts": forecasts,
+        "unknown_crops": [c for c in crops if c.lower() not in forecasts]
+    }
+
+class RetrainRequest(BaseModel):
+    crops: Optional[List[str]] = None  # None retrains every crop
+    force: bool = False  # Refit even if an artifact for the current data exists
+
+@router.post("/predict/retrain", status_code=status.HTTP_202_ACCEPTED)
+async def retrain_price_models(
+    request: RetrainRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin)
+):
+    """Retrain price models in the background; current models keep serving until the swap."""
+    if prediction_service.training_status["state"] == "running":
+        raise HTTPException(status_code=409, detail="Retraining already in progress")
+    crops = [c.lower() for c in request.crops] if request.crops else None
+    background_tasks.add_task(prediction_service.retrain, crops, request.force)
+    return {"status": "scheduled"}
+
+class Observation(BaseModel):
+    month: int = Field(ge=1, le=12)
+    year: int = Field(ge=1900, le=2100)
+    rainfall: float
+    wpi: float
+
+class IngestRequest(BaseModel):
+    observations: List[Observation] = Field(min_length=1)
+
+@router.post("/predict/{crop_name}/observations", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_crop_observations(
+    crop_name: str,
+    request: IngestRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin)
+):
+    """Append monthly WPI/rainfall rows for one crop; only that crop is retrained and swapped."""
+    if crop_name.lower() not in prediction_service.get_supported_crops():
+        raise HTTPException(status_code=404, detail="Crop not found")
+    rows = [(o.month, o.year, o.rainfall, o.wpi) for o in request.observations]
+    background_tasks.add_task(prediction_service.ingest, crop_name, rows)
+    return {"status": "scheduled", "crop": crop_name.lower(), "rows": len(rows)}
+
+@router.get("/predict/training")
+async def get_training_status():
+    release = prediction_service.release
+    return {**prediction_service.training_status, "current_release": release["version"] if release else None}
+
+@router.post("/predict/releases/{version}/activate")
+def activate_price_model_release(version: str, current_user: User = Depends(get_current_admin)):
+    """Roll back (or forward) to a published release of the price models."""
+    try:
+        release = prediction_service.activate(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Release not found")
+    return {"status": "active", "version": release["version"]}
+
+@router.post("/analyze/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_analysis_job(
+    user_input: UserInput,
+    current_user: User = Depends(get_current_user)
+):
+    """Queue an analysis and return its job id; fetch the result by polling or over the WebSocket."""
+    try:
+        job = await analysis_jobs.submit(current_user.email, user_input, _user_context(current_user))
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many analyses in progress, please retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    return {"job_id": str(job.id), "status": job.status}
+
+@router.get("/analyze/jobs/{job_id}")
+async def get_analysis_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await analysis_jobs.get(job_id)
+    if not job or job.user_email != current_user.email:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+@router.websocket("/analyze/jobs/{job_id}/ws")
+async def watch_analysis_job(websocket: WebSocket, job_id: str, token: Optional[str] = None):
+    """Pushes the job's state whenever it changes and closes once it has finished."""
+    user = await verify_token(token) if token else None
+    job = await analysis_jobs.get(job_id) if user else None
+    if not job or job.user_email != user.email:
+        await websocket.close(code=4001)
+        return
+
+    await websocket.accept()
+    try:
+        await websocket.send_json(job_view(job))
+        last_status = job.status
+        while job.status not in FINISHED:
+            await analysis_jobs.wait(job_id, timeout=2.0)
+            job = await analysis_jobs.get(job_id)
+            if not job:
+                break
+            if job.status != last_status:
+                await websocket.send_json(job_view(job))
+                last_status = job.status
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/analyze/jobs")
+async def get_analysis_job_stats(current_user: User = Depends(get_current_admin)):
+    return {**analysis_jobs.stats, "queued": analysis_jobs.depth(), "workers": analysis_jobs.workers}
+
+@router.get("/analyze/cache")
+async def get_analysis_cache_stats(current_user: User = Depends(get_current_admin)):
+    return analysis_service.cache_stats
+
+@router.get("/history/writer")
+async def get_history_writer_stats(current_user: User = Depends(get_current_admin)):
+    return {**history_writer.stats, "pending": history_writer.depth()}
+
+@router.get("/providers/stats")
+async def get_provider_stats(current_user: User = Depends(get_current_admin)):
+    return provider_stats()
+
+@router.get("/models/stats")
+async def get_model_stats(current_user: User = Depends(get_current_admin)):
+    return model_router.stats()
+
+@router.get("/translation/memory")
+async def get_translation_memory_stats(current_user: User = Depends(get_current_admin)):
+    return translation_memory.metrics()
+
+@router.get("/tts/cache")
+async def get_tts_cache_stats(current_user: User = Depends(get_current_admin)):
+    return tts_cache.metrics()
+
 @router.get("/predict/{crop_name}")
-async def predict_crop_price(crop_name: str):
-    forecast = prediction_service.get_forecast(crop_name)
+def predict_crop_price(crop_name: str, ensemble: bool = False, quantiles: Optional[str] = None):
+    """Six-month forecast. `ensemble=true` or `quantiles=0.1,0.9` adds median and bands."""
+    bands = None
+    if ensemble or quantiles:
+        try:
+            values = [float(q) for q in quantiles.split(",")] if quantiles else list(prediction_service.default_quantiles)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Quantiles must be comma-separated numbers")
+        bands = _validate_quantiles(values)
+    forecast = prediction_service.get_forecast(crop_name, bands)
     if not forecast:
         raise HTTPException(status_code=404, detail="Crop not found or model unavailable")
     return forecast
@@ -223,13 +333,13 @@ class ChatRequest(BaseModel):
     history: List[Dict[str, str]] = []
     user_context: Optional[Dict[str, Any]] = None  # Accept user context from frontend
 
-@router.post("/chat")
-async def chat_with_ai(
-    request: ChatRequest,
-    current_user: User = Depends(get_current_user)
-):
+class ChatAudioRequest(BaseModel):
+    text: str
+    language: Optional[str] = None  # Sarvam code, e.g. 'hi-IN'; defaults to the user's language
+
+def _chat_user_context(current_user: User) -> Dict[str, Any]:
     # Build comprehensive user context from database (priority) and request
-    user_context = {
+    return {
         "username": current_user.username or "Farmer",
         "full_name": current_user.full_name or "",
         "age": current_user.age or 0,
@@ -241,24 +351,40 @@ async def chat_with_ai(
         "crops_grown": current_user.crops_grown or "Various",
         "preferred_language": current_user.preferred_language or "en"
     }
-    
+
+def _tts_language(current_user: User) -> str:
+    # Map language code to Sarvam format (e.g., 'en' -> 'en-IN')
+    lang_code = current_user.preferred_language or "en-IN"
+    if not lang_code.endswith("-IN"):
+        lang_code = f"{lang_code}-IN"
+    return lang_code
+
+def _chat_session(user_email: str, request: ChatRequest, response: str) -> ChatSession:
+    return ChatSession(
+        user_email=user_email,
+        title=request.message[:30] + "...",
+        messages=request.history + [{"role": "user", "content": request.message}, {"role": "assistant", "content": response}],
+        created_at=datetime.now(),
+        updated_at=datetime.now()
+    )
+
+@router.post("/chat")
+async def chat_with_ai(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user)
+):
     response = await chat_service.chat(
         messages=request.history + [{"role": "user", "content": request.message}], 
-        user_context=user_context,
+        user_context=_chat_user_context(current_user),
         analysis_context=request.context
     )
     
     # Generate TTS audio for the response
     audio_data = None
     try:
-        # Map language code to Sarvam format (e.g., 'en' -> 'en-IN')
-        lang_code = current_user.preferred_language or "en-IN"
-        if not lang_code.endswith("-IN"):
-            lang_code = f"{lang_code}-IN"
-        
         audio_data = await chat_service.text_to_speech(
             text=response,
-            target_language=lang_code,
+            target_language=_tts_language(current_user),
             speaker="anushka"
         )
         print(f"TTS audio generated for {current_user.email}: {len(audio_data) if audio_data else 0} bytes")
@@ -268,27 +394,156 @@ async def chat_with_ai(
     
     # Save chat session to history
     try:
-        chat_session = ChatSession(
-            user_email=current_user.email,
-            title=request.message[:30] + "...",
-            messages=request.history + [{"role": "user", "content": request.message}, {"role": "assistant", "content": response}],
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        await chat_session.save()
-        print(f"Chat session saved successfully for {current_user.email}")
+        chat_session = _chat_session(current_user.email, request, response)
+        history_writer.submit(chat_session)
+        print(f"Chat session queued for {current_user.email}")
     except Exception as e:
         print(f"Error saving chat session: {e}")
         import traceback
         traceback.print_exc()
     
-    # Return response with optional audio
-    result = {"response": response}
-    if audio_data:
-        import base64
-        result["audio"] = base64.b64encode(audio_data).decode('utf-8')
-    
-    return result
+    # Return response with optional audio, fetched separately from audio_url
+    return {"response": response, "audio_url": await _audio_url(audio_data)}
+
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    /chat as Server-Sent Events: a `token` event per text delta as the model
+    writes it, then one `done` event with the full reply and the id of the
+    saved chat session. No audio is synthesized here; the client asks for it
+    afterwards with POST /chat/audio, so text is never held up by TTS.
+    """
+    messages = request.history + [{"role": "user", "content": request.message}]
+    user_context = _chat_user_context(current_user)
+
+    async def events():
+        parts = []
+        async for delta in chat_service.chat_stream(messages, user_context, request.context):
+            parts.append(delta)
+            yield _sse("token", {"text": delta})
+
+        # Only a completed reply is saved; a client that disconnects mid-stream saves nothing
+        response = "".join(parts)
+        chat_session = _chat_session(current_user.email, request, response)
+        history_writer.submit(chat_session)
+        yield _sse("done", {
+            "response": response,
+            "session_id": str(chat_session.id),
+            "audio": {"method": "POST", "url": "/chat/audio"},
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _streamed_audio(text: str, language: str) -> StreamingResponse:
+    """
+    Chunked WAV response that starts with the first synthesized sentence. The
+    first chunk is awaited here so a TTS failure is still a plain 500.
+    """
+    audio = tts_service.stream(text, language)
+    try:
+        first = await audio.__anext__()
+    except (StopAsyncIteration, SpeechFailed):
+        raise HTTPException(status_code=500, detail="TTS failed")
+
+    async def body():
+        yield first
+        async for chunk in audio:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="audio/wav", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _audio_url(audio_data: bytes) -> Optional[str]:
+    """Store synthesized speech as a short-lived resource; None if there is none."""
+    audio_id = await audio_store.put(audio_data)
+    return audio_store.url(audio_id) if audio_id else None
+
+@router.get("/audio/{audio_id}")
+async def get_audio(
+    audio_id: str,
+    fmt: Optional[str] = Query(None, alias="format"),  # wav, opus or mp3
+    range_header: Optional[str] = Header(None, alias="Range"),
+    accept: Optional[str] = Header(None)
+):
+    """
+    A clip returned as audio_url by /chat, /voice/chat and /analysis/summarize.
+    No bearer token: <audio src> cannot send one, so the unguessable,
+    short-lived id is the credential. Supports single byte ranges for seeking
+    and resumed downloads.
+    """
+    located = await audio_store.locate(audio_id, audio_store.negotiate(fmt, accept))
+    if not located:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    grid_out, media_type = located
+
+    size = grid_out.length
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+        "Cache-Control": f"private, max-age={audio_store.ttl_seconds}",
+        "Vary": "Accept",
+    }
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        audio_store.iter_range(grid_out, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers
+    )
+
+@router.post("/chat/audio")
+async def chat_audio(
+    request: ChatAudioRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Speech for a chat reply, fetched after /chat/stream has finished the text."""
+    return await _streamed_audio(request.text, request.language or _tts_language(current_user))
+
+@router.websocket("/tts/ws")
+async def tts_socket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Send {"text": ..., "language": ...} as JSON; each sentence chunk comes back
+    in order as its own binary WAV message, followed by {"event": "done"}.
+    The socket stays open for further texts.
+    """
+    user = await verify_token(token) if token else None
+    if not user:
+        await websocket.close(code=4001)
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            request = await websocket.receive_json()
+            text = (request.get("text") or "").strip()
+            if not text:
+                await websocket.send_json({"event": "error", "detail": "No text"})
+                continue
+            sent = 0
+            try:
+                async for wav in tts_service.chunks(text, request.get("language") or _tts_language(user)):
+                    await websocket.send_bytes(wav)
+                    sent += 1
+            except SpeechFailed:
+                # The chunks already sent are the start of the text, never a clip with a gap
+                await websocket.send_json({"event": "error", "detail": "TTS failed", "chunks": sent})
+                continue
+            await websocket.send_json({"event": "done", "chunks": sent})
+    except WebSocketDisconnect:
+        pass
 
 @router.get("/history/analyses", response_model=List[AnalysisHistory])
 async def get_analysis_history(current_user: User = Depends(get_current_user)):
@@ -382,11 +637,8 @@ async def text_to_speech(
     language: str = "en-IN",
     current_user: User = Depends(get_current_user)
 ):
-    """Convert text to speech using Sarvam Bulbul."""
-    audio_data = await chat_service.text_to_speech(text, language)
-    if audio_data:
-        return Response(content=audio_data, media_type="audio/wav")
-    raise HTTPException(status_code=500, detail="TTS failed")
+    """Convert text to speech using Sarvam Bulbul, streamed sentence by sentence."""
+    return await _streamed_audio(text, language)
 
 class VoiceChatRequest(BaseModel):
     language_code: str = "hi-IN"
@@ -437,9 +689,7 @@ async def voice_chat(
     
     # 3. Convert response to speech using user's language
     audio_response = await chat_service.text_to_speech(response_text, user_lang)
-    
-    import base64
-    audio_b64 = base64.b64encode(audio_response).decode() if audio_response else ""
+    audio_url = await _audio_url(audio_response)
     
     # 4. Save voice chat to history
     try:
@@ -453,8 +703,8 @@ async def voice_chat(
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
-        await voice_chat_session.save()
-        print(f"Voice chat session saved successfully for {current_user.email}")
+        history_writer.submit(voice_chat_session)
+        print(f"Voice chat session queued for {current_user.email}")
     except Exception as e:
         print(f"Error saving voice chat session: {e}")
         import traceback
@@ -464,7 +714,7 @@ async def voice_chat(
         "transcript": transcript,
         "response": response_text,
         "language": detected_language,
-        "audio": audio_b64
+        "audio_url": audio_url
     }
 
 class SummarizeRequest(BaseModel):
@@ -511,12 +761,9 @@ Create a friendly, helpful summary that covers the key points and recommendation
         # Convert to speech using Sarvam Bulbul with the correct language
         audio_data = await chat_service.text_to_speech(summary, request.language)
         
-        import base64
-        audio_b64 = base64.b64encode(audio_data).decode() if audio_data else ""
-        
         return {
             "summary": summary,
-            "audio": audio_b64
+            "audio_url": await _audio_url(audio_data)
         }
     except Exception as e:
         print(f"Summarize error: {e}")
@@ -8,6 +8,25 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
     
+    # Resilience layer (app/services/resilience.py), shared by all providers
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive provider failures that open the circuit
+    CIRCUIT_RESET_SECONDS: float = 30.0  # How long an open circuit fails fast before probing
+    PROVIDER_QUEUE_TIMEOUT: float = 10.0  # Longest wait for a concurrency slot before shedding
+    HUGGINGFACE_MAX_CONCURRENCY: int = 4
+    NOMINATIM_MAX_CONCURRENCY: int = 1
+    NOMINATIM_MIN_INTERVAL: float = 1.0  # Seconds between request starts, per process (usage policy: 1 request/second)
+
+    # OpenAI
+    OPENAI_TIMEOUT: float = 60.0  # Default per-request timeout in seconds
+    OPENAI_MODERATION_TIMEOUT: float = 15.0
+    OPENAI_TRANSCRIPTION_TIMEOUT: float = 120.0
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_MAX_CONCURRENCY: int = 16  # In-flight OpenAI calls per worker
+
+    # Model router: per-task overrides of app/services/model_router.py DEFAULT_ROUTES,
+    # e.g. {"chat": {"models": ["gpt-4o-mini"], "budget": 20}}
+    MODEL_ROUTES: dict = {}
+
     # Gemini
     GEMINI_API_KEY: str = ""
     
@@ -29,9 +48,62 @@ class Settings(BaseSettings):
     # Hugging Face (for CLIP/BLIP image captioning)
     HUGGINGFACE_API_KEY: str = ""
 
+    # Price prediction models
+    PREDICTION_DATA_DIR: str = "app/data"
+    PREDICTION_SERIES_DIR: str = "app/artifacts/series"  # Memory-mapped copy of PREDICTION_DATA_DIR
+    MODEL_ARTIFACT_DIR: str = "app/artifacts/models"
+    PREDICTION_MAX_DEPTH: int = 12
+    PREDICTION_RANDOM_STATE: int = 42
+    PREDICTION_LAZY_LOADING: bool = False  # Load crop models on first use instead of at boot
+    PREDICTION_MAX_RESIDENT_MODELS: int = 32  # LRU cap on fitted models kept in memory (lazy mode)
+    TRAINING_WORKERS: int = 0  # Processes for model training (0 = CPU count)
+    PREDICTION_ENSEMBLE_SIZE: int = 25  # Bagged trees per crop for forecast bands
+    PREDICTION_QUANTILES: list[float] = [0.1, 0.9]  # Default band around the ensemble median
+
+    # Gemini
+    GEMINI_MAX_CONCURRENCY: int = 8  # In-flight Gemini calls per worker
+
+    # /analyze stage timeouts in seconds (optional stages fall back when late)
+    ANALYSIS_WEATHER_TIMEOUT: float = 8.0
+    ANALYSIS_PRICE_TIMEOUT: float = 5.0
+    ANALYSIS_FORECAST_TIMEOUT: float = 3.0
+
+    # /analyze result cache
+    ANALYSIS_CACHE_TTL: int = 1800  # Seconds a parsed report is reused for identical inputs
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 1024  # Reports kept per worker
+
+    # /analyze/jobs worker pool
+    ANALYSIS_JOB_WORKERS: int = 4  # Analyses run concurrently per process
+    ANALYSIS_JOB_QUEUE_SIZE: int = 100  # Waiting jobs before submissions get 503
+    ANALYSIS_JOB_LEASE_SECONDS: int = 60  # A running job without a heartbeat for this long is re-queued
+    ANALYSIS_JOB_SWEEP_SECONDS: int = 30  # How often each process looks for expired leases and orphaned jobs
+    ANALYSIS_JOB_MAX_ATTEMPTS: int = 3
+    ANALYSIS_JOB_TTL_HOURS: int = 24  # Finished and abandoned jobs expire after this
+
+    # Write-behind history persistence
+    HISTORY_BATCH_SIZE: int = 100  # Documents per insert_many
+    HISTORY_FLUSH_INTERVAL: float = 1.0  # Seconds a batch may wait to fill up
+    HISTORY_QUEUE_SIZE: int = 10000
+    HISTORY_MAX_RETRIES: int = 5  # Retries of a batch after a connection error
+
+    # Sarvam translation
+    SARVAM_TRANSLATE_MAX_CHARS: int = 1000  # Input limit per translate request
+    SARVAM_MAX_CONCURRENCY: int = 4  # In-flight Sarvam requests (translate and TTS) per worker
+    TRANSLATION_MEMORY_MAX_ENTRIES: int = 10000  # In-process LRU tier
+    TRANSLATION_MEMORY_TTL_DAYS: int = 30  # MongoDB tier expiry
+
+    # Sarvam text-to-speech
+    TTS_CHUNK_MAX_CHARS: int = 300  # Sentences are packed into requests up to this size
+    TTS_PARALLEL_CHUNKS: int = 3  # Chunks of one text synthesized at once
+    TTS_CACHE_DIR: str = "/tmp/cropic/tts-cache"  # Shared by the workers on one host
+    TTS_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    TTS_CACHE_SCAN_SECONDS: float = 60.0  # How often a writing worker re-measures the directory and evicts
+    AUDIO_TTL_SECONDS: int = 900  # How long an audio URL stays valid
+
     # Security
     SECRET_KEY: str = "your_secret_key" # Change in production
     ALGORITHM: str = "HS256"
+    ADMIN_EMAILS: list[str] = []  # Users allowed to run operator actions (model retraining, data ingestion)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
     # CORS
@@ -1,21 +1,23 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from app.core.config import settings
-from app.models import User, AnalysisHistory, ChatSession, CommunityMessage, CommunityRoom
+from app.models import User, AnalysisHistory, ChatSession, CommunityMessage, CommunityRoom, TranslationMemoryEntry, AnalysisJob
 
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
 
-# Global GridFS bucket
+# Global GridFS buckets
 fs = None
+audio_fs = None  # Short-lived speech clips, see app/services/audio_store.py
 
 async def init_db():
-    global fs
+    global fs, audio_fs
     client = AsyncIOMotorClient(settings.MONGODB_URL)
     db = client.cropic_db
     fs = AsyncIOMotorGridFSBucket(db)
+    audio_fs = AsyncIOMotorGridFSBucket(db, bucket_name="audio")
     
     await init_beanie(
         database=db, 
-        document_models=[User, AnalysisHistory, ChatSession, CommunityMessage, CommunityRoom]
+        document_models=[User, AnalysisHistory, ChatSession, CommunityMessage, CommunityRoom, TranslationMemoryEntry, AnalysisJob]
     )
 
@@ -1,7 +1,9 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict
-from beanie import Document
+from typing import Any, Optional, List, Dict
+from beanie import Document, Indexed
 from datetime import datetime
+from pymongo import ASCENDING, IndexModel
+from app.core.config import settings
 
 class User(Document):
     email: EmailStr
@@ -75,6 +77,52 @@ class ChatSession(Document):
     class Settings:
         name = "chats"
 
+class TranslationMemoryEntry(Document):
+    """A remembered machine translation; see app/services/translation_memory.py."""
+    key: Indexed(str, unique=True)  # model:source:target:sha256(normalized text)
+    source_lang: str
+    target_lang: str
+    model: str
+    source_text: str
+    translated_text: str
+    created_at: datetime = datetime.now()
+
+    class Settings:
+        name = "translation_memory"
+        indexes = [
+            IndexModel(
+                [("created_at", ASCENDING)],
+                expireAfterSeconds=settings.TRANSLATION_MEMORY_TTL_DAYS * 24 * 3600,
+            )
+        ]
+
+class AnalysisJob(Document):
+    """A queued /analyze request; see app/services/analysis_jobs.py."""
+    user_email: EmailStr
+    user_input: Dict[str, Any]
+    user_context: Dict[str, Any]
+    status: str = "queued"  # queued, running, done, failed
+    result: Optional[Dict[str, Any]] = None  # AnalysisResult fields
+    parsed: Optional[bool] = None
+    cache: Optional[str] = None  # HIT, COALESCED or MISS
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime = datetime.now()
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None  # Lease heartbeat while running
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "analysis_jobs"
+        indexes = [
+            [("status", ASCENDING), ("created_at", ASCENDING)],
+            [("status", ASCENDING), ("updated_at", ASCENDING)],
+            IndexModel(
+                [("created_at", ASCENDING)],
+                expireAfterSeconds=settings.ANALYSIS_JOB_TTL_HOURS * 3600,
+            ),
+        ]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
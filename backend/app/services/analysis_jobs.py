@@ -0,0 +1,272 @@
+"""
+Asynchronous /analyze jobs.
+
+POST /analyze/jobs stores an AnalysisJob and returns its id straight away. A
+fixed pool of ANALYSIS_JOB_WORKERS tasks drains a bounded in-memory queue of
+job ids, so at most that many analyses (and their Gemini/translation calls)
+run at once per process. When ANALYSIS_JOB_QUEUE_SIZE jobs are already waiting,
+new submissions are refused instead of piling up.
+
+The job document is the source of truth: workers claim a job by flipping it
+from "queued" to "running" atomically, so a job is only processed once even
+with several processes, and results are read back from MongoDB.
+
+A claim is a lease. While the analysis runs, the worker refreshes the job's
+updated_at; a job whose heartbeat is older than ANALYSIS_JOB_LEASE_SECONDS
+belongs to a worker that crashed or hung. Every ANALYSIS_JOB_SWEEP_SECONDS
+each process puts such jobs back to "queued" and picks up queued jobs nobody
+is attending to. An outcome is only recorded while its lease is still held,
+so a worker that lost its lease cannot overwrite the retry. On shutdown,
+running jobs are handed back to the queue without costing them an attempt.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set as SetType
+
+from beanie import PydanticObjectId
+from beanie.operators import Inc, Or, Set
+
+from app.core.config import settings
+from app.models import AnalysisJob, AnalysisResult, UserInput
+from app.services.analysis_service import analysis_service
+
+FINISHED = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the job queue has no room."""
+
+
+def job_view(job: AnalysisJob) -> Dict[str, Any]:
+    """What clients see of a job, for polling and WebSocket pushes."""
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "result": job.result,
+        "parsed": job.parsed,
+        "cache": job.cache,
+        "error": job.error,
+    }
+
+
+class AnalysisJobQueue:
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._pending: SetType[str] = set()  # Job ids on this process's queue
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "recovered": 0}
+
+    async def start(self):
+        """Start the worker pool and the lease sweep. Call once the database is up."""
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+        print(f"Analysis Jobs: Started {self.workers} workers (queue size {self.max_queued})")
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back to "queued" (see _run)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def submit(self, user_email: str, user_input: UserInput, user_context: Dict[str, Any]) -> AnalysisJob:
+        if self._queue is None or self._queue.full():
+            self.stats["rejected"] += 1
+            raise QueueFull()
+
+        now = datetime.now()
+        job = AnalysisJob(
+            user_email=user_email,
+            user_input=user_input.model_dump(),
+            user_context=user_context,
+            created_at=now,
+            updated_at=now,
+        )
+        await job.insert()
+        try:
+            self._enqueue(str(job.id))
+        except asyncio.QueueFull:
+            # Filled up while the job was being stored
+            await job.delete()
+            self.stats["rejected"] += 1
+            raise QueueFull()
+        self.stats["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[AnalysisJob]:
+        try:
+            return await AnalysisJob.get(PydanticObjectId(job_id))
+        except Exception:
+            return None
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        """
+        Wait up to `timeout` seconds for this process to finish the job.
+        Returns False on timeout; the job may still have been finished by
+        another process, so callers re-read it either way.
+        """
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            # Jobs finished elsewhere never set the event; do not keep it around
+            self._finished.pop(job_id, None)
+            return False
+
+    def _enqueue(self, job_id: str):
+        self._queue.put_nowait(job_id)
+        self._pending.add(job_id)
+
+    async def _sweep_loop(self):
+        # The first pass, at startup, takes every queued job: any left by the
+        # previous run of this process would otherwise wait out a lease
+        everything = True
+        while True:
+            try:
+                await self._sweep(everything)
+                everything = False
+            except Exception as e:
+                print(f"Analysis Jobs: Sweep failed: {e}")
+            await asyncio.sleep(settings.ANALYSIS_JOB_SWEEP_SECONDS)
+
+    async def _sweep(self, everything: bool = False):
+        cutoff = datetime.now() - timedelta(seconds=settings.ANALYSIS_JOB_LEASE_SECONDS)
+        unattended = Or(AnalysisJob.updated_at == None, AnalysisJob.updated_at < cutoff)  # noqa: E711
+
+        # Running jobs whose worker stopped heartbeating. updated_at is left
+        # as it is, so the queued pass below (here or in another process)
+        # picks them up straight away.
+        released = await AnalysisJob.find(AnalysisJob.status == "running", unattended).update(
+            Set({AnalysisJob.status: "queued"})
+        )
+        if released and released.modified_count:
+            print(f"Analysis Jobs: Released {released.modified_count} jobs with expired leases")
+
+        # Queued jobs nobody is attending to: left by a dead process, released
+        # above, or waiting too long behind another process's queue. Claims
+        # are atomic, so taking a job that is also queued elsewhere is harmless.
+        query = AnalysisJob.find(AnalysisJob.status == "queued")
+        if not everything:
+            query = query.find(unattended)
+        jobs = await query.sort("+created_at").limit(self.max_queued).to_list()
+
+        recovered = 0
+        for job in jobs:
+            job_id = str(job.id)
+            if job_id in self._pending:
+                continue
+            if job.attempts >= settings.ANALYSIS_JOB_MAX_ATTEMPTS:
+                await self._finish(job, status="failed", error="Gave up after repeated interruptions")
+                continue
+            try:
+                self._enqueue(job_id)
+            except asyncio.QueueFull:
+                break  # The rest wait for the next sweep
+            recovered += 1
+        if recovered:
+            self.stats["recovered"] += recovered
+            print(f"Analysis Jobs: Re-queued {recovered} unfinished jobs")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Analysis Jobs: Job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _heartbeat(self, job: AnalysisJob):
+        """Refresh the lease on `job` until cancelled, or until the lease turns out to be lost."""
+        interval = settings.ANALYSIS_JOB_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await self._held(job).update(Set({AnalysisJob.updated_at: datetime.now()}))
+            except Exception as e:
+                print(f"Analysis Jobs: Heartbeat for job {job.id} failed: {e}")
+                continue
+            if not renewed or not renewed.modified_count:
+                print(f"Analysis Jobs: Job {job.id} lost its lease")
+                return
+
+    def _held(self, job: AnalysisJob):
+        """Query matching `job` only while it is still in the state it was read in."""
+        return AnalysisJob.find_one(
+            AnalysisJob.id == job.id, AnalysisJob.status == job.status, AnalysisJob.attempts == job.attempts
+        )
+
+    async def _run(self, job_id: str):
+        now = datetime.now()
+        claimed = await AnalysisJob.find_one(
+            AnalysisJob.id == PydanticObjectId(job_id), AnalysisJob.status == "queued"
+        ).update(
+            Set({AnalysisJob.status: "running", AnalysisJob.started_at: now, AnalysisJob.updated_at: now}),
+            Inc({AnalysisJob.attempts: 1}),
+        )
+        if not claimed or not claimed.modified_count:
+            return  # Another process has it, or it is already finished
+
+        job = await AnalysisJob.get(PydanticObjectId(job_id))
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            try:
+                user_input = UserInput(**job.user_input)
+                report, parsed, cache = await analysis_service.analyze_shared(user_input, job.user_context)
+            except Exception as e:
+                print(f"Analysis Jobs: Job {job_id} failed: {e}")
+                await self._finish(job, status="failed", error="Analysis failed")
+                return
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back for the next process, without
+            # charging it an attempt, instead of leaving it "running"
+            await self._held(job).update(
+                Set({AnalysisJob.status: "queued", AnalysisJob.updated_at: None}), Inc({AnalysisJob.attempts: -1})
+            )
+            raise
+        finally:
+            heartbeat.cancel()
+
+        if parsed:
+            analysis_service.save_history(job.user_email, user_input, report)
+        await self._finish(
+            job,
+            status="done",
+            result=AnalysisResult(**report).model_dump(),
+            parsed=parsed,
+            cache=cache,
+        )
+
+    async def _finish(self, job: AnalysisJob, **fields) -> bool:
+        """
+        Record the outcome of `job`, unless it has moved on since it was read
+        (its lease expired and it was re-queued or claimed again). Returns
+        whether the outcome was recorded.
+        """
+        fields["finished_at"] = datetime.now()
+        result = await self._held(job).update(Set(fields))
+        if not result or not result.modified_count:
+            print(f"Analysis Jobs: Job {job.id} changed hands; dropping its {fields.get('status')} outcome")
+            return False
+        self.stats["completed" if fields.get("status") == "done" else "failed"] += 1
+
+        event = self._finished.pop(str(job.id), None)
+        if event is not None:
+            event.set()
+        return True
+
+
+analysis_jobs = AnalysisJobQueue(settings.ANALYSIS_JOB_WORKERS, settings.ANALYSIS_JOB_QUEUE_SIZE)
@@ -0,0 +1,449 @@
+"""
+Analysis pipeline behind /analyze.
+
+The stages form a small dependency graph:
+
+    weather ──┐
+    prices  ──┼──> gemini ──> parse ──> translate
+    forecast ─┘
+
+Weather, market prices and the model forecast are independent, so they run
+concurrently, each under its own timeout. They are all optional: a stage that
+fails or runs late is replaced by a fallback text and Gemini starts with
+whatever is ready.
+
+analyze_stream runs the same graph but reports progress as it goes: each
+context stage as it settles, then every report section as soon as Gemini has
+finished writing it (translated on its own, concurrently with the rest of the
+generation), and finally the complete report.
+
+Parsed reports are cached for ANALYSIS_CACHE_TTL seconds under a key made of
+the normalized input and the profile fields the prompt uses (see cache_key).
+Identical requests that arrive while one is being computed wait for it
+instead of starting their own (single flight).
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Set, Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.models import AnalysisHistory, UserInput
+from app.services.crop_matcher import crop_matcher
+from app.services.gemini_service import gemini_service
+from app.services.history_writer import history_writer
+from app.services.prediction_service import prediction_service
+from app.services.price_service import price_service
+from app.services.sarvam_service import sarvam_service
+from app.services.weather_service import weather_service
+
+
+def format_forecast_block(crop: str, forecast: List[dict]) -> str:
+    """Markdown forecast section for the Gemini prompt, with ensemble bands when present."""
+    bands = list(forecast[0].get("bands", {}))
+    if not bands:
+        lines = [f"- {f['month']}: ₹{f['price']}" for f in forecast]
+        return f"\n**AI Price Forecast for {crop.capitalize()} (Next 6 Months):**\n" + "\n".join(lines) + "\n"
+
+    low, high = bands[0], bands[-1]
+    lines = [
+        f"- {f['month']}: ₹{f['price']} (range ₹{f['bands'][low]['price']} - ₹{f['bands'][high]['price']})"
+        for f in forecast
+    ]
+    return (
+        f"\n**AI Price Forecast for {crop.capitalize()} (Next 6 Months, ensemble median with {low}-{high} range):**\n"
+        + "\n".join(lines) + "\n"
+    )
+
+
+def language_key(language: Optional[str]) -> str:
+    """Canonical language code: case and "_" do not matter, and every English variant is "en"."""
+    code = (language or "en").strip().replace("_", "-").casefold()
+    return "en" if code.split("-")[0] in ("", "en") else code
+
+
+def is_english(language: Optional[str]) -> bool:
+    return language_key(language) == "en"
+
+
+def _normalize(text: Optional[str]) -> str:
+    """Case, Unicode form, whitespace and trailing punctuation do not change an analysis."""
+    text = unicodedata.normalize("NFC", text or "").casefold()
+    return re.sub(r"\s+", " ", text).strip(" .,;")
+
+
+def age_bucket(age: Optional[int]) -> str:
+    if not age:
+        return "Not specified"
+    start = age // 10 * 10
+    return f"{start}-{start + 9}"
+
+
+# Report keys in the order the prompt asks for them
+REPORT_FIELDS = (
+    "soil_type",
+    "recommended_crops",
+    "weather_analysis",
+    "price_prediction",
+    "detailed_advice",
+    "applicable_schemes",
+)
+
+
+class ReportScanner:
+    """
+    Picks finished fields out of a JSON report that is still being generated.
+    A field is finished once its value parses completely, so the text can be
+    re-scanned after every chunk without waiting for the closing brace.
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = REPORT_FIELDS):
+        self._patterns = {field: re.compile(rf'(?<!\\)"{field}"\s*:\s*') for field in fields}
+        self._decoder = json.JSONDecoder()
+        self.found: Dict[str, Any] = {}
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Fields completed since the last call, as (field, value)."""
+        completed = []
+        for field, pattern in self._patterns.items():
+            if field in self.found:
+                continue
+            match = pattern.search(text)
+            if not match:
+                continue
+            try:
+                value, end = self._decoder.raw_decode(text, match.end())
+            except json.JSONDecodeError:
+                continue
+            # A bare number or literal may still be growing at the end of the text
+            if end == len(text) and not isinstance(value, (str, list, dict)):
+                continue
+            self.found[field] = value
+            completed.append((field, value))
+        return completed
+
+
+class AnalysisService:
+    def __init__(self):
+        self._results: TTLCache = TTLCache(maxsize=settings.ANALYSIS_CACHE_MAX_ENTRIES, ttl=settings.ANALYSIS_CACHE_TTL)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.cache_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def _optional_stage(self, name: str, stage: Awaitable[str], timeout: float, fallback: str, timings: Dict[str, float], failed: Optional[Set[str]] = None) -> str:
+        """Await a stage with a timeout; a late or failed stage yields `fallback` and is added to `failed`."""
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(stage, timeout)
+        except asyncio.TimeoutError:
+            print(f"Analysis: {name} stage timed out after {timeout}s, continuing without it")
+        except Exception as e:
+            print(f"Analysis: {name} stage failed: {e}")
+        finally:
+            timings[name] = round(time.perf_counter() - started, 3)
+        if failed is not None:
+            failed.add(name)
+        return fallback
+
+    def _forecast_context(self, previous_crops: str) -> str:
+        """Forecast every supported crop mentioned in the farmer's history (any language)."""
+        mentioned_crops = crop_matcher.find_all(previous_crops)
+        forecasts = prediction_service.lookup_forecasts(mentioned_crops, prediction_service.default_quantiles)
+        return "".join(format_forecast_block(crop, forecast) for crop, forecast in forecasts.items())
+
+    def _context_stages(self, user_input: UserInput, timings: Dict[str, float], failed: Optional[Set[str]] = None) -> Dict[str, Awaitable[str]]:
+        """The weather, price and forecast stages, keyed by name (not yet started)."""
+        return {
+            "weather": self._optional_stage(
+                "weather",
+                weather_service.get_weather(user_input.location),
+                settings.ANALYSIS_WEATHER_TIMEOUT,
+                "Weather data unavailable. Assume normal seasonal weather for the location.",
+                timings,
+                failed
+            ),
+            "prices": self._optional_stage(
+                "prices",
+                price_service.get_prices(user_input.location),
+                settings.ANALYSIS_PRICE_TIMEOUT,
+                f"Market data for {user_input.location} unavailable. Use your knowledge of recent mandi prices.",
+                timings,
+                failed
+            ),
+            # Lookups are usually O(1) but may load a model in lazy mode, so keep them off the loop
+            "forecast": self._optional_stage(
+                "forecast",
+                asyncio.to_thread(self._forecast_context, user_input.previous_crops),
+                settings.ANALYSIS_FORECAST_TIMEOUT,
+                "",
+                timings,
+                failed
+            ),
+        }
+
+    async def gather_context(self, user_input: UserInput, timings: Optional[Dict[str, float]] = None) -> Dict[str, str]:
+        """Run the weather, price and forecast stages concurrently."""
+        timings = timings if timings is not None else {}
+        stages = self._context_stages(user_input, timings)
+        values = await asyncio.gather(*stages.values())
+        return dict(zip(stages, values))
+
+    @staticmethod
+    def parse_report(gemini_response: str) -> Optional[Dict[str, Any]]:
+        """Parse Gemini's JSON report; None if it is not valid JSON."""
+        try:
+            # Clean up json string if needed
+            cleaned_response = gemini_response.replace("```json", "").replace("```", "").strip()
+            return json.loads(cleaned_response)
+        except json.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def fallback_report(gemini_response: str) -> Dict[str, Any]:
+        return {
+            "soil_type": "Analysis failed to parse",
+            "recommended_crops": [],
+            "weather_analysis": "N/A",
+            "price_prediction": "N/A",
+            "detailed_advice": gemini_response  # Return raw text
+        }
+
+    async def translate_report(self, analysis_result: Dict[str, Any], language: str) -> Dict[str, Any]:
+        """Translate the report's text fields in place (Sarvam AI), in one batch."""
+        print(f"Analysis: Starting translation to {language}")
+        fields = ["detailed_advice", "weather_analysis", "price_prediction", "soil_type"]
+        if analysis_result.get("applicable_schemes"):
+            fields.append("applicable_schemes")
+        crops = analysis_result.get("recommended_crops", [])
+        segments = [analysis_result.get(field, "") for field in fields] + list(crops)
+
+        translated = await sarvam_service.translate_batch(segments, language)
+
+        for field, text in zip(fields, translated):
+            analysis_result[field] = text
+        analysis_result["recommended_crops"] = translated[len(fields):]
+        return analysis_result
+
+    async def _translate_value(self, value: Any, language: str) -> Any:
+        """Translate one report section: a string, or a list of strings."""
+        if isinstance(value, list):
+            return await sarvam_service.translate_batch(value, language)
+        if isinstance(value, str):
+            return (await sarvam_service.translate_batch([value], language))[0]
+        return value
+
+    async def _translate_or_keep(self, field: str, value: Any, language: str) -> Any:
+        """_translate_value, falling back to the English text if Sarvam fails."""
+        try:
+            return await self._translate_value(value, language)
+        except Exception as e:
+            print(f"Analysis: Translation of {field} failed, keeping English: {e}")
+            return value
+
+    async def analyze(self, user_input: UserInput, user_context: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Run the full pipeline. Returns (report, parsed); when Gemini's output
+        is not valid JSON the report carries the raw text and parsed is False.
+        """
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        context = await self.gather_context(user_input, timings)
+        full_price_context = f"{context['prices']}\n{context['forecast']}"
+
+        gemini_started = time.perf_counter()
+        gemini_response = await gemini_service.analyze_farm(user_input, context["weather"], full_price_context, user_context)
+        timings["gemini"] = round(time.perf_counter() - gemini_started, 3)
+
+        analysis_result = self.parse_report(gemini_response)
+        if analysis_result is None:
+            return self.fallback_report(gemini_response), False
+
+        print(f"Analysis: Language requested = '{user_input.language}'")
+        if not is_english(user_input.language):
+            translate_started = time.perf_counter()
+            await self.translate_report(analysis_result, user_input.language)
+            timings["translate"] = round(time.perf_counter() - translate_started, 3)
+
+        timings["total"] = round(time.perf_counter() - started, 3)
+        print(f"Analysis: Stage timings (s) {timings}")
+        return analysis_result, True
+
+    def save_history(self, user_email: str, user_input: UserInput, analysis_result: Dict[str, Any]):
+        """Queue the report for the user's analysis history (written behind, in batches)."""
+        try:
+            history_entry = AnalysisHistory(
+                user_email=user_email,
+                location=user_input.location,
+                land_size=user_input.land_size,
+                previous_crops=user_input.previous_crops,
+                soil_type=analysis_result.get("soil_type", ""),
+                recommended_crops=analysis_result.get("recommended_crops", []),
+                weather_analysis=analysis_result.get("weather_analysis", ""),
+                price_prediction=analysis_result.get("price_prediction", ""),
+                detailed_advice=analysis_result.get("detailed_advice", ""),
+                applicable_schemes=analysis_result.get("applicable_schemes", ""),
+                created_at=datetime.now()
+            )
+            history_writer.submit(history_entry)
+            print(f"Analysis history queued for {user_email}")
+        except Exception as e:
+            print(f"Error saving analysis history: {e}")
+            import traceback
+            traceback.print_exc()
+
+    @staticmethod
+    def cache_key(user_input: UserInput, user_context: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Cache key for an analysis, plus the user context to compute it with.
+        The context keeps only what the key covers (no name, age as a
+        decade), so a cached report never carries another farmer's details.
+        """
+        shared_context = {
+            "full_name": "",
+            "age": age_bucket(user_context.get("age")),
+            "gender": _normalize(user_context.get("gender")),
+            "caste_category": _normalize(user_context.get("caste_category")),
+        }
+        parts = [
+            _normalize(user_input.location),
+            _normalize(user_input.land_size),
+            _normalize(user_input.previous_crops),
+            language_key(user_input.language),
+            shared_context["age"],
+            shared_context["gender"],
+            shared_context["caste_category"],
+        ]
+        key = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+        return key, shared_context
+
+    def cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        report = self._results.get(key)
+        if report is None:
+            return None
+        self.cache_stats["hits"] += 1
+        return copy.deepcopy(report)
+
+    def store_result(self, key: str, report: Dict[str, Any]):
+        self._results[key] = copy.deepcopy(report)
+
+    async def analyze_shared(self, user_input: UserInput, user_context: Dict[str, Any]) -> Tuple[Dict[str, Any], bool, str]:
+        """
+        analyze() behind the result cache. Returns (report, parsed, cache)
+        where cache is "HIT", "COALESCED" (joined an identical in-flight
+        analysis) or "MISS". Only parsed reports are cached.
+        """
+        key, shared_context = self.cache_key(user_input, user_context)
+        report = self.cached_result(key)
+        if report is not None:
+            return report, True, "HIT"
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.cache_stats["coalesced"] += 1
+            status = "COALESCED"
+        else:
+            self.cache_stats["misses"] += 1
+            status = "MISS"
+            task = asyncio.create_task(self.analyze(user_input, shared_context))
+            self._inflight[key] = task
+
+            def finished(done: asyncio.Task):
+                self._inflight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    report, parsed = done.result()
+                    if parsed:
+                        self.store_result(key, report)
+
+            task.add_done_callback(finished)
+
+        # Shielded: one caller disconnecting must not cancel the others' analysis
+        report, parsed = await asyncio.shield(task)
+        return copy.deepcopy(report), parsed, status
+
+    async def analyze_stream(self, user_input: UserInput, user_context: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the pipeline, yielding (event, data) pairs:
+
+            progress  {"stage", "status", "seconds"?}   a context stage settled, or Gemini started
+            section   {"field", "value"}                a report field, translated if needed
+            result    {"report", "parsed"}              the full report, as analyze() returns it
+        """
+        timings: Dict[str, float] = {}
+        failed: Set[str] = set()
+        started = time.perf_counter()
+
+        async def named(name: str, stage: Awaitable[str]) -> Tuple[str, str]:
+            return name, await stage
+
+        context = {}
+        stages = self._context_stages(user_input, timings, failed)
+        for next_done in asyncio.as_completed([named(name, stage) for name, stage in stages.items()]):
+            name, value = await next_done
+            context[name] = value
+            status = "unavailable" if name in failed else "ready"
+            yield "progress", {"stage": name, "status": status, "seconds": timings[name]}
+
+        yield "progress", {"stage": "report", "status": "generating"}
+        full_price_context = f"{context['prices']}\n{context['forecast']}"
+        translating = not is_english(user_input.language)
+        events: asyncio.Queue = asyncio.Queue()
+        translated: Dict[str, Any] = {}
+
+        async def translate_section(field: str, value: Any):
+            translated[field] = await self._translate_or_keep(field, value, user_input.language)
+            await events.put(("section", {"field": field, "value": translated[field]}))
+
+        async def generate() -> str:
+            scanner = ReportScanner()
+            text = ""
+            translations = []
+            try:
+                async for chunk in gemini_service.analyze_farm_stream(user_input, context["weather"], full_price_context, user_context):
+                    text += chunk
+                    for field, value in scanner.feed(text):
+                        if translating:
+                            translations.append(asyncio.create_task(translate_section(field, value)))
+                        else:
+                            await events.put(("section", {"field": field, "value": value}))
+                await asyncio.gather(*translations)
+            finally:
+                await events.put(None)
+            return text
+
+        gemini_started = time.perf_counter()
+        producer = asyncio.create_task(generate())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            gemini_response = await producer
+        finally:
+            # The client went away mid-stream; stop generating for nobody
+            if not producer.done():
+                producer.cancel()
+        timings["gemini"] = round(time.perf_counter() - gemini_started, 3)
+
+        analysis_result = self.parse_report(gemini_response)
+        if analysis_result is None:
+            yield "result", {"report": self.fallback_report(gemini_response), "parsed": False}
+            return
+
+        if translating:
+            # Sections the scanner missed (e.g. unusual formatting) are translated now
+            missing = [f for f in REPORT_FIELDS if f not in translated and analysis_result.get(f)]
+            values = await asyncio.gather(*(self._translate_or_keep(f, analysis_result[f], user_input.language) for f in missing))
+            translated.update(zip(missing, values))
+            analysis_result.update(translated)
+
+        timings["total"] = round(time.perf_counter() - started, 3)
+        print(f"Analysis: Stage timings (s) {timings}")
+        yield "result", {"report": analysis_result, "parsed": True}
+
+
+analysis_service = AnalysisService()
@@ -0,0 +1,184 @@
+"""
+Short-lived audio resources.
+
+Synthesized speech is no longer sent base64-encoded inside JSON. It is
+stored here and the response carries a URL, GET /audio/{id}. The client
+streams it as binary, with Range support, so an <audio> element can start
+playing and seek without downloading the whole clip first.
+
+Ids are random and unguessable, because a plain <audio src> cannot send the
+bearer token. Clips live in MongoDB GridFS (the "audio" bucket, set up in
+app/db.py), so an audio URL works on every replica, not only on the one
+that synthesized it. They expire AUDIO_TTL_SECONDS after upload; a lazy sweep
+deletes expired files.
+
+When ffmpeg is installed, a client can ask for Opus (audio/ogg) or MP3
+instead of WAV, through ?format= or its Accept header. That is roughly a
+tenth of the size for speech on metered mobile data. Each clip is
+transcoded once per format and the result is stored next to the WAV as
+<id>.<extension>.
+"""
+import asyncio
+import re
+import secrets
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional, Tuple
+
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridOut
+
+from app import db
+from app.core.config import settings
+
+# format -> (media type, file extension, ffmpeg encoder arguments)
+FORMATS = {
+    "wav": ("audio/wav", "wav", None),
+    "opus": ("audio/ogg", "ogg", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"]),
+    "mp3": ("audio/mpeg", "mp3", ["-c:a", "libmp3lame", "-b:a", "48k"]),
+}
+# Accept header media types, in the order we prefer them
+ACCEPT_FORMATS = [("audio/ogg", "opus"), ("audio/opus", "opus"), ("audio/mpeg", "mp3"), ("audio/mp3", "mp3")]
+AUDIO_ID = re.compile(r"[A-Za-z0-9_-]{16,64}")
+READ_SIZE = 64 * 1024
+SWEEP_INTERVAL = 60.0
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) for a single `bytes=` range, or None to send the
+    whole file. Multi-range and malformed headers are ignored, as RFC 9110
+    allows.
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header or "")
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class AudioStore:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.ffmpeg = shutil.which("ffmpeg")
+        self._last_sweep = 0.0
+        self.stats = {"stored": 0, "served": 0, "transcoded": 0, "transcode_errors": 0, "expired": 0}
+
+    def url(self, audio_id: str) -> str:
+        return f"{settings.API_V1_STR}/audio/{audio_id}"
+
+    async def _sweep(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        async for grid_out in db.audio_fs.find({"uploadDate": {"$lt": cutoff}}):
+            try:
+                await db.audio_fs.delete(grid_out._id)
+                self.stats["expired"] += 1
+            except NoFile:
+                pass  # Swept by another replica
+
+    async def put(self, data: bytes) -> Optional[str]:
+        """Store a WAV clip; returns its id, or None if there is nothing to store."""
+        if not data:
+            return None
+        if db.audio_fs is None:
+            print("Audio Store: GridFS not initialized")
+            return None
+        audio_id = secrets.token_urlsafe(16)
+        await db.audio_fs.upload_from_stream(f"{audio_id}.wav", data, metadata={"content_type": FORMATS["wav"][0]})
+        self.stats["stored"] += 1
+
+        if time.monotonic() - self._last_sweep > SWEEP_INTERVAL:
+            self._last_sweep = time.monotonic()
+            try:
+                await self._sweep()
+            except Exception as e:
+                print(f"Audio Store: Sweep failed: {e}")
+        return audio_id
+
+    def negotiate(self, requested: Optional[str], accept: Optional[str]) -> str:
+        """Format to serve: ?format= wins, then the Accept header; WAV if ffmpeg is missing."""
+        if not self.ffmpeg:
+            return "wav"
+        if requested in FORMATS:
+            return requested
+        accept = (accept or "").lower()
+        for media_type, fmt in ACCEPT_FORMATS:
+            if media_type in accept:
+                return fmt
+        return "wav"
+
+    async def _open(self, audio_id: str, extension: str) -> Optional[AsyncIOMotorGridOut]:
+        try:
+            return await db.audio_fs.open_download_stream_by_name(f"{audio_id}.{extension}")
+        except NoFile:
+            return None
+
+    async def _transcode(self, audio_id: str, source: AsyncIOMotorGridOut, fmt: str) -> Optional[AsyncIOMotorGridOut]:
+        media_type, extension, encoder = FORMATS[fmt]
+        target = await self._open(audio_id, extension)
+        if target is not None:
+            return target
+
+        # Speech clips are small, so ffmpeg reads and writes pipes, not temp files
+        wav = await source.read()
+        source.seek(0)
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, "-nostdin", "-loglevel", "error", "-i", "pipe:0", *encoder, "-f", "ogg" if fmt == "opus" else fmt, "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        encoded, stderr = await process.communicate(wav)
+        if process.returncode != 0 or not encoded:
+            print(f"Audio Store: ffmpeg {fmt} failed: {stderr.decode(errors='replace')[:200]}")
+            self.stats["transcode_errors"] += 1
+            return None
+        # Concurrent requests for the same clip may both transcode; the newest upload is served
+        await db.audio_fs.upload_from_stream(f"{audio_id}.{extension}", encoded, metadata={"content_type": media_type})
+        self.stats["transcoded"] += 1
+        return await self._open(audio_id, extension)
+
+    async def locate(self, audio_id: str, fmt: str) -> Optional[Tuple[AsyncIOMotorGridOut, str]]:
+        """(GridFS file, media type) of a live clip in `fmt` (WAV if transcoding fails), or None."""
+        if not AUDIO_ID.fullmatch(audio_id) or db.audio_fs is None:
+            return None
+        source = await self._open(audio_id, "wav")
+        if source is None:
+            return None
+        uploaded = source.upload_date.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - uploaded > timedelta(seconds=self.ttl_seconds):
+            return None
+
+        self.stats["served"] += 1
+        if fmt != "wav":
+            target = await self._transcode(audio_id, source, fmt)
+            if target is not None:
+                return target, FORMATS[fmt][0]
+        return source, FORMATS["wav"][0]
+
+    async def iter_range(self, grid_out: AsyncIOMotorGridOut, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes start..end (inclusive) of a GridFS file."""
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(READ_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+audio_store = AudioStore(settings.AUDIO_TTL_SECONDS)
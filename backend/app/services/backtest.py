@@ -0,0 +1,206 @@
+"""
+Backtest and benchmark harness for the commodity price models.
+
+Runs rolling-origin backtests over every series in app/data: for each fold the
+model is fitted on all months before the origin and scored on the next
+`horizon` months. Error metrics, fit/predict latency and model memory are
+reported per crop and per estimator, so the production tree can be compared
+against alternatives and against a previous report.
+
+Scoring calls the estimators directly. CommodityModel.predict's `year >= 2019`
+gate is not applied because the backtest windows are historical.
+
+    python -m app.services.backtest --output backtest.json
+    python -m app.services.backtest --compare backtest.json --tolerance 0.1
+"""
+import argparse
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from app.core.config import settings
+from app.services.dataset_store import DatasetStore, build as build_dataset
+from app.services.training_pipeline import ensemble_params, model_params
+
+
+class SeasonalNaive:
+    """Predicts the WPI observed in the same month of the last training year."""
+
+    def fit(self, X, y):
+        self.by_month = {}
+        for (month, _, _), value in zip(X, y):
+            self.by_month[int(month)] = value
+        self.fallback = y[-1]
+        return self
+
+    def predict(self, X):
+        return np.array([self.by_month.get(int(month), self.fallback) for month in X[:, 0]])
+
+
+class LastValue:
+    """Predicts the last observed WPI for every future month."""
+
+    def fit(self, X, y):
+        self.value = y[-1]
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.value)
+
+
+def estimators() -> Dict[str, Callable[[], Any]]:
+    """Factories for every estimator under test. `production*` mirror CommodityModel."""
+    params = model_params()
+    return {
+        "production": lambda: DecisionTreeRegressor(**params),
+        "production_ensemble": lambda: RandomForestRegressor(**ensemble_params()),
+        "random_forest": lambda: RandomForestRegressor(
+            n_estimators=100, max_depth=params["max_depth"], random_state=params["random_state"]
+        ),
+        "gradient_boosting": lambda: GradientBoostingRegressor(random_state=params["random_state"]),
+        "seasonal_naive": SeasonalNaive,
+        "last_value": LastValue,
+    }
+
+
+def _errors(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
+    diff = predicted - actual
+    return {
+        "mae": float(np.mean(np.abs(diff))),
+        "rmse": float(np.sqrt(np.mean(diff ** 2))),
+        "mape": float(np.mean(np.abs(diff) / np.abs(actual)) * 100),
+    }
+
+
+def backtest_series(X: np.ndarray, y: np.ndarray, factory: Callable[[], Any], horizon: int, folds: int, min_train: int) -> Optional[Dict[str, Any]]:
+    """Rolling-origin backtest of one estimator on one series."""
+    origins = [len(y) - (folds - f) * horizon for f in range(folds)]
+    origins = [o for o in origins if o >= min_train]
+    if not origins:
+        return None
+
+    fold_errors, fit_seconds, predict_seconds, peak_bytes = [], [], [], []
+    model = None
+    for origin in origins:
+        model = factory()
+        tracemalloc.start()
+        started = time.perf_counter()
+        model.fit(X[:origin], y[:origin])
+        fit_seconds.append(time.perf_counter() - started)
+        peak_bytes.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        test_X, test_y = X[origin:origin + horizon], y[origin:origin + horizon]
+        started = time.perf_counter()
+        predicted = model.predict(test_X)
+        predict_seconds.append(time.perf_counter() - started)
+        fold_errors.append(_errors(test_y, predicted))
+
+    # Single-row latency is what a per-month request path pays
+    row = X[-1:]
+    calls = 200
+    started = time.perf_counter()
+    for _ in range(calls):
+        model.predict(row)
+    single_row_us = (time.perf_counter() - started) / calls * 1e6
+
+    return {
+        "folds": len(origins),
+        **{metric: float(np.mean([e[metric] for e in fold_errors])) for metric in ("mae", "rmse", "mape")},
+        "fit_ms": float(np.mean(fit_seconds) * 1000),
+        "predict_batch_ms": float(np.mean(predict_seconds) * 1000),
+        "predict_single_row_us": float(single_row_us),
+        "fit_peak_bytes": int(max(peak_bytes)),
+        "model_bytes": len(pickle.dumps(model)),
+    }
+
+
+def run(horizon: int = 6, folds: int = 4, min_train: int = 24, names: Optional[List[str]] = None) -> Dict[str, Any]:
+    index = build_dataset(settings.PREDICTION_DATA_DIR, settings.PREDICTION_SERIES_DIR)
+    dataset = DatasetStore(settings.PREDICTION_SERIES_DIR)
+    dataset.refresh(index)
+    factories = estimators()
+    names = names or list(factories)
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "sklearn": sklearn.__version__,
+        "config": {"horizon": horizon, "folds": folds, "min_train": min_train, "params": model_params()},
+        "estimators": {},
+    }
+    for name in names:
+        crops = {}
+        for key in dataset.names():
+            X, y = dataset.training_data(key)
+            # Rolling origins assume chronological order
+            order = np.lexsort((X[:, 0], X[:, 1]))
+            result = backtest_series(X[order], y[order], factories[name], horizon, folds, min_train)
+            if result:
+                crops[key] = result
+
+        summary = {}
+        if crops:
+            for metric in next(iter(crops.values())):
+                summary[metric] = float(np.mean([c[metric] for c in crops.values()]))
+        report["estimators"][name] = {"summary": summary, "crops": crops}
+        print(f"Backtest: {name} MAE={summary.get('mae', float('nan')):.2f} fit={summary.get('fit_ms', float('nan')):.2f}ms", file=sys.stderr)
+    return report
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of the current report against a baseline, as human-readable lines."""
+    regressions = []
+    watched = ("mae", "rmse", "mape", "fit_ms", "predict_single_row_us", "model_bytes")
+    for name, current in report["estimators"].items():
+        previous = baseline.get("estimators", {}).get(name)
+        if not previous:
+            continue
+        for metric in watched:
+            old, new = previous["summary"].get(metric), current["summary"].get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {old:.4g} -> {new:.4g}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtest and benchmark the price prediction models.")
+    parser.add_argument("--horizon", type=int, default=6, help="Months scored after each origin")
+    parser.add_argument("--folds", type=int, default=4, help="Rolling origins per series")
+    parser.add_argument("--min-train", type=int, default=24, help="Minimum training months per fold")
+    parser.add_argument("--estimator", action="append", dest="estimators", choices=list(estimators()), help="Only run this estimator (repeatable)")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline report; exit 1 if any watched metric regresses")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression vs baseline")
+    args = parser.parse_args(argv)
+
+    report = run(args.horizon, args.folds, args.min_train, args.estimators)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    for line in regressions:
+        print(f"Backtest regression: {line}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,16 @@
-from openai import OpenAI  # Use sync client for responses API
 from app.core.config import settings
-from typing import List, Dict, Any, Tuple
-import httpx
-import tempfile
-import os
+from app.services.model_router import model_router
+from app.services.openai_client import openai_client, openai_slot
+from app.services.tts_service import tts_service
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import json
 
 class ChatService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.model = "gpt-4o"  # Using gpt-4o (latest available model)
-        self.sarvam_api_key = settings.SARVAM_API_KEY
-        self.tts_url = "https://api.sarvam.ai/text-to-speech"
+        self.client = openai_client
 
-    async def chat(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None, analysis_context: str = "") -> str:
+    def _api_messages(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None, analysis_context: str = "") -> List[Dict[str, str]]:
+        """System prompt (user profile and analysis context) followed by the conversation."""
         system_prompt = """You are an expert agricultural assistant for the 'Cropic' app.
         Your goal is to help farmers with personalized crop advice, pest control, market trends, and GOVERNMENT SCHEMES.
         
@@ -63,28 +60,45 @@ class ChatService:
             analysis_context=analysis_context if analysis_context else "No current analysis - using general user profile context."
         )
 
+        # Build messages for standard Chat Completion API
+        api_messages = [
+            {"role": "system", "content": system_prompt}
+        ]
+        
+        # Add conversation history
+        for msg in messages:
+            role = msg.get("role", "user")
+            content = msg.get("content", "")
+            api_messages.append({
+                "role": role,
+                "content": content
+            })
+        return api_messages
+
+    def _error_reply(self, e: Exception) -> str:
+        error_msg = str(e)
+        print(f"Chat Error: {error_msg}")
+        if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
+            return "I'm sorry, there's an issue with the AI service configuration. Please contact support."
+        elif "model" in error_msg.lower():
+            return f"I'm sorry, there's a model configuration issue: {error_msg}"
+        return f"I'm sorry, I encountered an error: {error_msg}"
+
+    async def chat(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None, analysis_context: str = "") -> str:
+        api_messages = self._api_messages(messages, user_context, analysis_context)
         try:
-            # Build messages for standard Chat Completion API
-            api_messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Add conversation history
-            for msg in messages:
-                role = msg.get("role", "user")
-                content = msg.get("content", "")
-                api_messages.append({
-                    "role": role,
-                    "content": content
-                })
-            
-            # Call Chat Completion API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=api_messages,
-                temperature=0.7,
-                max_tokens=1024
-            )
+            # Call Chat Completion API (model chosen by the router's "chat" route)
+            async def complete(model: str):
+                async with openai_slot():
+                    return await self.client.chat.completions.create(
+                        model=model,
+                        messages=api_messages,
+                        temperature=0.7,
+                        max_tokens=1024,
+                        timeout=settings.OPENAI_TIMEOUT
+                    )
+
+            response = await model_router.run("chat", complete)
             
             # Extract text from response
             if response.choices and len(response.choices) > 0:
@@ -93,13 +107,35 @@ class ChatService:
             return "I apologize, I couldn't generate a response. Please try again."
             
         except Exception as e:
-            error_msg = str(e)
-            print(f"Chat Error: {error_msg}")
-            if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
-                return "I'm sorry, there's an issue with the AI service configuration. Please contact support."
-            elif "model" in error_msg.lower():
-                return f"I'm sorry, there's a model configuration issue: {error_msg}"
-            return f"I'm sorry, I encountered an error: {error_msg}"
+            return self._error_reply(e)
+
+    async def chat_stream(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None, analysis_context: str = "") -> AsyncIterator[str]:
+        """Same reply as chat(), yielded as text deltas while the model generates it."""
+        api_messages = self._api_messages(messages, user_context, analysis_context)
+
+        async def open_stream(model: str) -> AsyncIterator[Optional[str]]:
+            async with openai_slot():
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=api_messages,
+                    temperature=0.7,
+                    max_tokens=1024,
+                    stream=True,
+                    timeout=settings.OPENAI_TIMEOUT
+                )
+                async for chunk in stream:
+                    yield chunk.choices[0].delta.content if chunk.choices else None
+
+        replied = False
+        try:
+            async for delta in model_router.stream("chat", open_stream):
+                replied = True
+                yield delta
+        except Exception as e:
+            yield self._error_reply(e)
+            return
+        if not replied:
+            yield "I apologize, I couldn't generate a response. Please try again."
     
     async def chat_with_language(self, messages: List[Dict[str, str]], user_context: Dict[str, Any] = None, analysis_context: str = "") -> Tuple[str, str]:
         """Chat and also detect the language of the response for TTS."""
@@ -140,70 +176,25 @@ class ChatService:
             elif audio_data.startswith(b'\x1f\x8b'):
                 file_ext = ".gz"
             
-            # Save audio to temp file with appropriate extension
-            with tempfile.NamedTemporaryFile(suffix=file_ext, delete=False) as tmp_file:
-                tmp_file.write(audio_data)
-                tmp_path = tmp_file.name
+            # Upload straight from memory; the file name carries the format for Whisper
+            kwargs = {"language": language} if language and language != "auto" else {}
+            async with openai_slot():
+                transcript = await self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(f"audio{file_ext}", audio_data),
+                    timeout=settings.OPENAI_TRANSCRIPTION_TIMEOUT,
+                    **kwargs
+                )
             
-            try:
-                # Transcribe using Whisper with language hint
-                with open(tmp_path, "rb") as audio_file:
-                    transcript = self.client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language=language if language and language != "auto" else None
-                    )
-                
-                transcript_text = transcript.text if hasattr(transcript, 'text') else str(transcript)
-                return transcript_text.strip()
-            finally:
-                # Clean up temp file
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            transcript_text = transcript.text if hasattr(transcript, 'text') else str(transcript)
+            return transcript_text.strip()
         except Exception as e:
             print(f"Whisper STT Error: {e}")
             print(f"Audio data size: {len(audio_data)} bytes")
             return ""
     
     async def text_to_speech(self, text: str, target_language: str = "en-IN", speaker: str = "anushka") -> bytes:
-        """Convert text to speech using Sarvam AI Bulbul."""
-        try:
-            headers = {
-                "api-subscription-key": self.sarvam_api_key,
-                "content-type": "application/json"
-            }
-            
-            payload = {
-                "inputs": [text],
-                "target_language_code": target_language,
-                "speaker": speaker,
-                "pitch": 0,
-                "pace": 1.0,
-                "loudness": 1.5,
-                "speech_sample_rate": 22050,
-                "enable_preprocessing": True,
-                "model": "bulbul:v2"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.tts_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                # Sarvam returns base64 encoded audio in 'audios' array
-                if "audios" in data and len(data["audios"]) > 0:
-                    import base64
-                    audio_b64 = data["audios"][0]
-                    return base64.b64decode(audio_b64)
-                
-                return b""
-        except Exception as e:
-            print(f"Sarvam TTS Error: {e}")
-            return b""
+        """Convert text to speech using Sarvam AI Bulbul (sentence chunks synthesized in parallel)."""
+        return await tts_service.synthesize(text, target_language, speaker)
 
 chat_service = ChatService()
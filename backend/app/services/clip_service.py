@@ -10,6 +10,7 @@ import tempfile
 import os
 from typing import List, Optional
 from app.core.config import settings
+from app.services.resilience import providers, raise_for_provider_status
 
 
 class CLIPService:
@@ -39,12 +40,13 @@ class CLIPService:
             raise ValueError("Image moderation service not configured. Please contact admin.")
             
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with providers["huggingface"].slot(), httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
                     self.api_url,
                     headers=self.headers,
                     content=image_bytes
                 )
+                raise_for_provider_status(response)
                 
                 if response.status_code == 200:
                     result = response.json()
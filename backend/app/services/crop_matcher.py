@@ -0,0 +1,234 @@
+"""
+Crop entity matcher - finds every supported commodity mentioned in free text.
+
+Each commodity the prediction service knows has aliases in English
+(including common transliterations), Hindi, Kannada, Tamil and Telugu. All
+aliases are compiled once into a single regular expression, so one pass over
+the text finds every mention.
+"""
+import re
+from typing import Dict, List
+
+# Keys match the prediction service's crop names (CSV file names, lower-cased)
+CROP_ALIASES: Dict[str, Dict[str, List[str]]] = {
+    "paddy": {
+        "en": ["paddy", "rice", "dhan"],
+        "hi": ["धान", "चावल"],
+        "kn": ["ಭತ್ತ", "ಅಕ್ಕಿ"],
+        "ta": ["நெல்", "அரிசி"],
+        "te": ["వరి", "బియ్యం"],
+    },
+    "wheat": {
+        "en": ["wheat", "gehu", "gehun", "gehoon"],
+        "hi": ["गेहूं", "गेहूँ", "गेंहू"],
+        "kn": ["ಗೋಧಿ"],
+        "ta": ["கோதுமை"],
+        "te": ["గోధుమ"],
+    },
+    "arhar": {
+        "en": ["arhar", "tur", "toor", "tuvar", "pigeon pea", "pigeonpea", "red gram"],
+        "hi": ["अरहर", "तुअर", "तूर"],
+        "kn": ["ತೊಗರಿ"],
+        "ta": ["துவரை"],
+        "te": ["కంది"],
+    },
+    "bajra": {
+        "en": ["bajra", "pearl millet"],
+        "hi": ["बाजरा"],
+        "kn": ["ಸಜ್ಜೆ"],
+        "ta": ["கம்பு"],
+        "te": ["సజ్జ"],
+    },
+    "barley": {
+        "en": ["barley", "jau"],
+        "hi": ["जौ"],
+        "kn": ["ಬಾರ್ಲಿ"],
+        "ta": ["பார்லி"],
+        "te": ["బార్లీ"],
+    },
+    "copra": {
+        "en": ["copra", "coconut", "khopra"],
+        "hi": ["खोपरा", "नारियल"],
+        "kn": ["ಕೊಬ್ಬರಿ", "ತೆಂಗು", "ತೆಂಗಿನಕಾಯಿ"],
+        "ta": ["கொப்பரை", "தேங்காய்", "தென்னை"],
+        "te": ["కొబ్బరి"],
+    },
+    "cotton": {
+        "en": ["cotton", "kapas"],
+        "hi": ["कपास"],
+        "kn": ["ಹತ್ತಿ"],
+        "ta": ["பருத்தி"],
+        "te": ["పత్తి"],
+    },
+    "sesamum": {
+        "en": ["sesamum", "sesame", "til", "gingelly"],
+        "hi": ["तिल"],
+        "kn": ["ಎಳ್ಳು"],
+        "ta": ["எள்"],
+        "te": ["నువ్వులు", "నువ్వు"],
+    },
+    "gram": {
+        "en": ["gram", "chana", "chickpea", "bengal gram"],
+        "hi": ["चना"],
+        "kn": ["ಕಡಲೆ"],
+        "ta": ["கொண்டைக்கடலை"],
+        "te": ["శనగ"],
+    },
+    "groundnut": {
+        "en": ["groundnut", "peanut", "moongphali", "mungfali"],
+        "hi": ["मूंगफली", "मूँगफली"],
+        "kn": ["ಕಡಲೆಕಾಯಿ", "ಶೇಂಗಾ"],
+        "ta": ["நிலக்கடலை", "வேர்க்கடலை"],
+        "te": ["వేరుశనగ"],
+    },
+    "jowar": {
+        "en": ["jowar", "sorghum", "jola"],
+        "hi": ["ज्वार"],
+        "kn": ["ಜೋಳ"],
+        "ta": ["சோளம்"],
+        "te": ["జొన్న"],
+    },
+    "jute": {
+        "en": ["jute", "patsan"],
+        "hi": ["जूट", "पटसन"],
+        "kn": ["ಸೆಣಬು"],
+        "ta": ["சணல்"],
+        "te": ["జనుము"],
+    },
+    "maize": {
+        "en": ["maize", "corn", "makka", "makai", "bhutta"],
+        "hi": ["मक्का", "मकई", "भुट्टा"],
+        "kn": ["ಮೆಕ್ಕೆಜೋಳ", "ಮುಸುಕಿನಜೋಳ"],
+        "ta": ["மக்காச்சோளம்"],
+        "te": ["మొక్కజొన్న"],
+    },
+    "masoor": {
+        "en": ["masoor", "masur", "lentil"],
+        "hi": ["मसूर"],
+        "kn": ["ಮಸೂರ"],
+        "ta": ["மசூர்"],
+        "te": ["మసూర్"],
+    },
+    "moong": {
+        "en": ["moong", "mung", "green gram"],
+        "hi": ["मूंग", "मूँग"],
+        "kn": ["ಹೆಸರುಕಾಳು", "ಹೆಸರುಬೇಳೆ"],
+        "ta": ["பாசிப்பயறு", "பச்சைப்பயறு"],
+        "te": ["పెసర", "పెసలు"],
+    },
+    "niger": {
+        "en": ["niger seed", "nigerseed", "niger", "ramtil"],
+        "hi": ["रामतिल"],
+        "kn": ["ಗುರೆಳ್ಳು", "ಹುಚ್ಚೆಳ್ಳು"],
+        "ta": ["பேயெள்"],
+        "te": ["వెర్రినువ్వులు", "గడ్డినువ్వులు"],
+    },
+    "ragi": {
+        "en": ["ragi", "finger millet", "nachni", "mandua"],
+        "hi": ["रागी", "मंडुआ", "मडुआ"],
+        "kn": ["ರಾಗಿ"],
+        "ta": ["கேழ்வரகு", "ராகி"],
+        "te": ["రాగి", "రాగులు"],
+    },
+    "rape": {
+        "en": ["rapeseed", "rape seed", "mustard", "sarson"],
+        "hi": ["सरसों", "राई"],
+        "kn": ["ಸಾಸಿವೆ"],
+        "ta": ["கடுகு"],
+        "te": ["ఆవాలు"],
+    },
+    "safflower": {
+        "en": ["safflower", "kusum", "kardi"],
+        "hi": ["कुसुम", "करडी"],
+        "kn": ["ಕುಸುಬೆ"],
+        "ta": ["குசம்பா"],
+        "te": ["కుసుమ"],
+    },
+    "soyabean": {
+        "en": ["soyabean", "soybean", "soya bean", "soya", "soy"],
+        "hi": ["सोयाबीन"],  # Not bare "सोया": it also means "slept"
+        "kn": ["ಸೋಯಾಬೀನ್", "ಸೋಯಾ"],
+        "ta": ["சோயாபீன்", "சோயா"],
+        "te": ["సోయాబీన్", "సోయా"],
+    },
+    "sugarcane": {
+        "en": ["sugarcane", "sugar cane", "ganna"],
+        "hi": ["गन्ना"],
+        "kn": ["ಕಬ್ಬು"],
+        "ta": ["கரும்பு"],
+        "te": ["చెరకు", "చెరుకు"],
+    },
+    "sunflower": {
+        "en": ["sunflower", "surajmukhi"],
+        "hi": ["सूरजमुखी"],
+        "kn": ["ಸೂರ್ಯಕಾಂತಿ"],
+        "ta": ["சூரியகாந்தி"],
+        "te": ["పొద్దుతిరుగుడు"],
+    },
+    "urad": {
+        "en": ["urad", "urd", "black gram"],
+        "hi": ["उड़द", "उड़द", "उरद"],
+        "kn": ["ಉದ್ದು"],
+        "ta": ["உளுந்து"],
+        "te": ["మినుములు", "మినుము"],
+    },
+}
+
+# Letters of the Indic scripts (Devanagari through Malayalam), including vowel signs,
+# which \w does not cover
+_INDIC = "\u0900-\u0D7F"
+
+# Case endings and plurals that may be written attached to an Indic alias
+# ("ಭತ್ತವನ್ನು", "गेहूंकी"). Anything else attached means the alias is only the
+# start of a longer word ("जौनपुर", "तिलहन") and is not a match.
+INDIC_SUFFIXES: Dict[str, List[str]] = {
+    "hi": ["का", "की", "के", "को", "में", "से", "ों", "ें"],
+    "kn": ["ವನ್ನು", "ಯನ್ನು", "ಗಳನ್ನು", "ಗಳು", "ದಲ್ಲಿ", "ಕ್ಕೆ", "ಕ್ಕಿಂತ", "ದ", "ವು", "ಗೆ"],
+    "ta": ["த்தை", "த்தின்", "க்கு", "கள்", "ில்", "ின்", "ும்", "ை"],
+    "te": ["లను", "లో", "లు", "ను", "ని", "కు", "పై"],
+}
+
+
+class CropMatcher:
+    """Finds crop mentions in one pass using a regex compiled from every alias."""
+
+    def __init__(self, aliases: Dict[str, Dict[str, List[str]]]):
+        entries = {}
+        for crop, by_language in aliases.items():
+            entries[crop] = (crop, "en")
+            for language, words in by_language.items():
+                for word in words:
+                    entries.setdefault(word.lower(), (crop, language))
+
+        # Longest first so "red gram" wins over "gram" and "मूंगफली" over "मूंग"
+        ordered = sorted(entries.items(), key=lambda entry: (-len(entry[0]), entry[0]))
+        self._crops = []
+        alternatives = []
+        for i, (name, (crop, language)) in enumerate(ordered):
+            self._crops.append(crop)
+            pattern = re.escape(name).replace(r"\ ", r"\s+")
+            if name.isascii():
+                # Whole words only, allowing plurals ("lentils", "tomatoes")
+                pattern += r"(?:e?s)?(?![\w])"
+            else:
+                # Whole words only, allowing the attached endings listed for the language
+                suffixes = sorted(INDIC_SUFFIXES.get(language, []), key=len, reverse=True)
+                if suffixes:
+                    pattern += f"(?:{'|'.join(map(re.escape, suffixes))})?"
+                pattern += f"(?![\\w{_INDIC}])"
+            alternatives.append(f"(?P<a{i}>{pattern})")
+        self._pattern = re.compile(f"(?<![\\w{_INDIC}])(?:{'|'.join(alternatives)})")
+
+    def find_all(self, text: str) -> List[str]:
+        """Crops mentioned in `text`, in order of first mention, without duplicates."""
+        if not text:
+            return []
+        found = []
+        for match in self._pattern.finditer(text.lower()):
+            crop = self._crops[int(match.lastgroup[1:])]
+            if crop not in found:
+                found.append(crop)
+        return found
+
+
+crop_matcher = CropMatcher(CROP_ALIASES)
@@ -0,0 +1,227 @@
+"""
+Commodity dataset store - compact columnar copies of the `Month,Year,Rainfall,WPI`
+CSVs in app/data.
+
+Each series is saved as one structured NumPy array (.npy) next to an index.json.
+Workers open the arrays with mmap_mode="r", so every process on a host shares a
+single page-cache copy instead of holding its own DataFrames.
+
+Build or refresh the dataset (only changed CSVs are rewritten):
+
+    python -m app.services.dataset_store build --data-dir app/data --out-dir app/artifacts/series
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SERIES_DTYPE = np.dtype([
+    ("month", "<i2"),
+    ("year", "<i2"),
+    ("rainfall", "<f8"),
+    ("wpi", "<f8"),
+])
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+DEFAULT_DATA_DIR = "app/data"
+DEFAULT_SERIES_DIR = "app/artifacts/series"
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, write) -> None:
+    """Write via a temp file in the same directory and rename it into place."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def csv_to_series(csv_path: str) -> np.ndarray:
+    """Read a Month,Year,Rainfall,WPI CSV into a structured array (columns by position)."""
+    frame = pd.read_csv(csv_path)
+    series = np.empty(len(frame), dtype=SERIES_DTYPE)
+    for column, field in enumerate(SERIES_DTYPE.names):
+        series[field] = frame.iloc[:, column].values
+    return series
+
+
+def read_index(series_dir: str) -> Dict:
+    path = os.path.join(series_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"version": INDEX_VERSION, "series": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_index(series_dir: str, index: Dict) -> None:
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+    _atomic_write(os.path.join(series_dir, INDEX_FILE), write)
+
+
+def write_series(series_dir: str, key: str, series: np.ndarray) -> str:
+    filename = f"{key}.npy"
+
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            np.save(f, series)
+    _atomic_write(os.path.join(series_dir, filename), write)
+    return filename
+
+
+def build_entry(csv_path: str, series_dir: str, source_hash: Optional[str] = None) -> Tuple[str, Dict]:
+    """Convert one CSV and return its (key, index entry)."""
+    filename = os.path.basename(csv_path)
+    name = filename.split('.')[0]
+    key = name.lower()
+    stat = os.stat(csv_path)
+    series = csv_to_series(csv_path)
+    return key, {
+        "name": name,
+        "file": write_series(series_dir, key, series),
+        "rows": int(len(series)),
+        "source": filename,
+        "source_hash": source_hash or _hash_file(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def build(data_dir: str = DEFAULT_DATA_DIR, series_dir: str = DEFAULT_SERIES_DIR, force: bool = False) -> Dict:
+    """
+    Convert every CSV in `data_dir` into `series_dir`. CSVs whose size and mtime
+    match the index are skipped without being read; entries for deleted CSVs
+    are dropped. Returns the new index.
+    """
+    os.makedirs(series_dir, exist_ok=True)
+    old_series = read_index(series_dir).get("series", {})
+    series = {}
+    changed = []
+
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".csv"):
+            continue
+        csv_path = os.path.join(data_dir, filename)
+        key = filename.split('.')[0].lower()
+        stat = os.stat(csv_path)
+        entry = old_series.get(key)
+        source_hash = None
+
+        if not force and entry and os.path.exists(os.path.join(series_dir, entry["file"])):
+            if entry.get("source_size") == stat.st_size and entry.get("source_mtime_ns") == stat.st_mtime_ns:
+                series[key] = entry
+                continue
+            # Touched but not modified (e.g. fresh checkout): refresh stat only
+            source_hash = _hash_file(csv_path)
+            if source_hash == entry.get("source_hash"):
+                series[key] = dict(entry, source_size=stat.st_size, source_mtime_ns=stat.st_mtime_ns)
+                continue
+
+        _, series[key] = build_entry(csv_path, series_dir, source_hash)
+        changed.append(key)
+
+    index = {"version": INDEX_VERSION, "series": series}
+    if series != old_series:
+        write_index(series_dir, index)
+    if changed:
+        print(f"Dataset Store: Rebuilt {len(changed)} series: {', '.join(changed)}")
+    return index
+
+
+def append_observations(csv_path: str, rows: List[Tuple[int, int, float, float]]) -> None:
+    """Append (month, year, rainfall, wpi) rows to a source CSV."""
+    with open(csv_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        needs_newline = False
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+        lines = "".join(f"{month},{year},{rainfall},{wpi}\n" for month, year, rainfall, wpi in rows)
+        f.write((("\n" if needs_newline else "") + lines).encode())
+
+
+def refresh_series(data_dir: str, series_dir: str, key: str) -> Dict:
+    """Rebuild a single series after its CSV changed and return the updated index."""
+    index = read_index(series_dir)
+    entry = index["series"][key]
+    _, index["series"][key] = build_entry(os.path.join(data_dir, entry["source"]), series_dir)
+    write_index(series_dir, index)
+    return index
+
+
+class DatasetStore:
+    """Read-only, memory-mapped access to the built commodity series."""
+
+    def __init__(self, series_dir: str = DEFAULT_SERIES_DIR):
+        self.series_dir = series_dir
+        self.index = read_index(series_dir)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def refresh(self, index: Optional[Dict] = None) -> None:
+        """Reload the index (after a build) and drop stale mappings."""
+        self.index = index if index is not None else read_index(self.series_dir)
+        self._arrays = {}
+
+    def names(self) -> List[str]:
+        return list(self.index.get("series", {}).keys())
+
+    def entry(self, key: str) -> Optional[Dict]:
+        return self.index.get("series", {}).get(key.lower())
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """Structured array for a series, mapped read-only and shared across processes."""
+        key = key.lower()
+        series = self._arrays.get(key)
+        if series is None:
+            entry = self.entry(key)
+            if entry is None:
+                return None
+            series = np.load(os.path.join(self.series_dir, entry["file"]), mmap_mode="r")
+            self._arrays[key] = series
+        return series
+
+    def training_data(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(X, y) with X as Month/Year/Rainfall columns and y as WPI."""
+        series = self.load(key)
+        if series is None:
+            return None
+        X = np.column_stack([series["month"], series["year"], series["rainfall"]]).astype(np.float64)
+        return X, np.asarray(series["wpi"])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the memory-mapped commodity dataset.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Convert CSVs into .npy series and an index")
+    build_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    build_parser.add_argument("--out-dir", default=DEFAULT_SERIES_DIR)
+    build_parser.add_argument("--force", action="store_true", help="Rewrite every series")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        index = build(args.data_dir, args.out_dir, force=args.force)
+        print(f"Dataset Store: {len(index['series'])} series in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,31 @@
+import asyncio
 from google import genai
 from app.core.config import settings
 from app.models import UserInput
-from typing import Dict, Any, Optional
+from app.services.model_router import model_router
+from app.services.resilience import providers
+from app.services.video_frames import extract_video_frames
+from typing import AsyncIterator, Dict, Any, Optional
 
 class GeminiService:
     def __init__(self):
         if settings.GEMINI_API_KEY:
             self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
-            self.model_name = "gemini-3-pro-preview"
         else:
             self.client = None
+        # Concurrency limit and circuit breaker for Gemini calls from this worker
+        self._guard = providers["gemini"]
 
-    async def analyze_farm(self, user_input: UserInput, weather_data: str, price_data: str, user_context: Optional[Dict[str, Any]] = None) -> str:
-        if not self.client:
-            return "Gemini API Key not configured."
+    async def _generate(self, model: str, contents, config=None):
+        """generate_content on the SDK's async client, through the Gemini provider guard."""
+        async with self._guard.slot():
+            return await self.client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config
+            )
 
+    def _farm_prompt(self, user_input: UserInput, weather_data: str, price_data: str, user_context: Optional[Dict[str, Any]] = None) -> str:
         # Extract user context for scheme recommendations
         gender = user_context.get('gender', 'Not specified') if user_context else 'Not specified'
         caste_category = user_context.get('caste_category', 'Not specified') if user_context else 'Not specified'
@@ -67,16 +78,42 @@ class GeminiService:
         - detailed_advice: string (markdown supported, include the SELL/HOLD recommendation and reasoning)
         - applicable_schemes: string (markdown supported, list of government schemes the user can apply for based on their gender, caste category, and land size. Include scheme name, eligibility, and how to apply)
         """
-        
+        return prompt
+
+    async def analyze_farm(self, user_input: UserInput, weather_data: str, price_data: str, user_context: Optional[Dict[str, Any]] = None) -> str:
+        if not self.client:
+            return "Gemini API Key not configured."
+
+        prompt = self._farm_prompt(user_input, weather_data, price_data, user_context)
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
+            response = await model_router.run("analysis", lambda model: self._generate(model, prompt))
             return response.text
         except Exception as e:
             return f"Error generating content: {str(e)}"
 
+    async def analyze_farm_stream(self, user_input: UserInput, weather_data: str, price_data: str, user_context: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Same report as analyze_farm, yielded as text chunks while Gemini generates it."""
+        if not self.client:
+            yield "Gemini API Key not configured."
+            return
+
+        prompt = self._farm_prompt(user_input, weather_data, price_data, user_context)
+
+        async def open_stream(model: str) -> AsyncIterator[str]:
+            async with self._guard.slot():
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=prompt
+                )
+                async for chunk in stream:
+                    yield chunk.text
+
+        try:
+            async for text in model_router.stream("analysis", open_stream):
+                yield text
+        except Exception as e:
+            yield f"Error generating content: {str(e)}"
+
     async def moderate_text(self, content: str) -> tuple[bool, str]:
         """
         Check if text is appropriate for agricultural community chat.
@@ -117,10 +154,7 @@ BLOCK (respond "NO"):
 Be STRICT. If not clearly about agriculture/farming, block it.
 Respond with ONLY "YES" or "NO"."""
             
-            response = self.client.models.generate_content(
-                model="models/gemini-2.5-flash-lite",
-                contents=prompt
-            )
+            response = await model_router.run("moderation", lambda model: self._generate(model, prompt))
             
             result = response.text.strip().upper()
             
@@ -147,29 +181,23 @@ Respond with ONLY "YES" or "NO"."""
             # For google-genai SDK (v1beta/v1), we use tools config.
             from google.genai import types
             
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-exp",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    tools=[types.Tool(google_search=types.GoogleSearch())]
-                )
+            search = types.GenerateContentConfig(
+                tools=[types.Tool(google_search=types.GoogleSearch())]
             )
+            response = await model_router.run("news", lambda model: self._generate(model, prompt, config=search))
             return response.text
         except Exception as e:
             print(f"Gemini Search Error: {e}")
             # Fallback to normal generation if search fails (e.g. model doesn't support it)
             try:
-                response = self.client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=prompt
-                )
+                response = await self._generate(model_router.models("news")[-1], prompt)
                 return response.text
             except Exception as e2:
                 return f"Error generating news: {str(e2)}"
 
     async def moderate_media(self, file_content: bytes, mime_type: str) -> tuple[bool, str]:
         """
-        Checks if the media (image/video) is agriculture-related using omni-moderation-2024-09-26.
+        Checks if the media (image/video) is agriculture-related (model router task "media_moderation").
         For videos, extracts 3 frames and validates them.
         Returns (is_allowed, reason)
         """
@@ -179,12 +207,6 @@ Respond with ONLY "YES" or "NO"."""
 
         try:
             from google.genai import types
-            import cv2
-            import numpy as np
-            import tempfile
-            import os
-            
-            model_name = "omni-moderation-2024-09-26"
             
             prompt_text = """
             Analyze this content. Is it related to agriculture, farming, crops, rural life, or nature?
@@ -211,32 +233,10 @@ Respond with ONLY "YES" or "NO"."""
             contents = []
             
             if mime_type.startswith("video/"):
-                # Extract frames
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-                    tmp.write(file_content)
-                    tmp_path = tmp.name
-                
-                try:
-                    cap = cv2.VideoCapture(tmp_path)
-                    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    
-                    if total_frames > 0:
-                        # Get 3 frames: 10%, 50%, 90%
-                        indices = [int(total_frames * 0.1), int(total_frames * 0.5), int(total_frames * 0.9)]
-                        
-                        for idx in indices:
-                            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-                            ret, frame = cap.read()
-                            if ret:
-                                # Encode frame to jpg
-                                _, buffer = cv2.imencode('.jpg', frame)
-                                contents.append(types.Part.from_bytes(data=buffer.tobytes(), mime_type="image/jpeg"))
-                    
-                    cap.release()
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
-                        
+                # Decoding video is CPU work; keep it off the event loop
+                frames = await asyncio.to_thread(extract_video_frames, file_content)
+                contents.extend(types.Part.from_bytes(data=frame, mime_type="image/jpeg") for frame in frames)
+
                 if not contents:
                     print("Could not extract frames from video")
                     return False, "Could not process video file"
@@ -248,20 +248,10 @@ Respond with ONLY "YES" or "NO"."""
             # Add prompt
             contents.append(prompt_text)
             
-            try:
-                response = self.client.models.generate_content(
-                    model=model_name,
-                    contents=contents
-                )
-            except Exception as e:
-                print(f"Model {model_name} failed, falling back to gemini-1.5-flash. Error: {e}")
-                response = self.client.models.generate_content(
-                    model="gemini-1.5-flash",
-                    contents=contents
-                )
+            response = await model_router.run("media_moderation", lambda model: self._generate(model, contents))
             
             result = response.text.strip().upper()
-            print(f"Moderation Result ({model_name}): {result}")
+            print(f"Moderation Result: {result}")
             
             if "YES" in result:
                 return True, "Allowed"
@@ -322,10 +312,7 @@ BLOCKED content (respond "NO"):
 Be STRICT. If the descriptions don't clearly indicate agriculture/farming content, block it.
 Respond with ONLY "YES" or "NO"."""
 
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-lite",
-                contents=prompt
-            )
+            response = await model_router.run("caption_validation", lambda model: self._generate(model, prompt))
             
             result = response.text.strip().upper()
             print(f"Caption Validation Result: {result} for captions: {captions}")
@@ -1,6 +1,7 @@
 import httpx
 from typing import Optional, Tuple
 import re
+from app.services.resilience import providers, raise_for_provider_status
 
 class GeocodingService:
     """Service for reverse geocoding coordinates to place names using Nominatim."""
@@ -29,7 +30,7 @@ class GeocodingService:
     async def reverse_geocode(self, lat: float, lon: float) -> str:
         """Convert coordinates to a human-readable place name."""
         try:
-            async with httpx.AsyncClient() as client:
+            async with providers["nominatim"].slot(), httpx.AsyncClient() as client:
                 response = await client.get(
                     self.base_url,
                     params={
@@ -42,6 +43,7 @@ class GeocodingService:
                     headers=self.headers,
                     timeout=10.0
                 )
+                raise_for_provider_status(response)
                 
                 if response.status_code == 200:
                     data = response.json()
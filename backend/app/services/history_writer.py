@@ -0,0 +1,149 @@
+"""
+Write-behind persistence for history documents (analyses, chat sessions).
+
+Request handlers hand the finished document to history_writer.submit() and
+return without waiting for MongoDB. A background task collects documents for
+up to HISTORY_FLUSH_INTERVAL seconds (or HISTORY_BATCH_SIZE documents) and
+writes each collection's share with one insert_many.
+
+Ids are assigned before the first attempt, so a batch retried after a
+connection error cannot create duplicates: rows that did land the first time
+come back as duplicate-key errors and are ignored. Remaining documents are
+flushed on shutdown.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Type
+
+from beanie import Document, PydanticObjectId
+from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
+
+from app.core.config import settings
+
+DUPLICATE_KEY = 11000
+
+
+class HistoryWriter:
+    def __init__(self, batch_size: int, flush_interval: float, max_queued: int, max_retries: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Document] = []  # Taken off the queue, not yet written
+        self._direct: Set[asyncio.Task] = set()
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0, "direct": 0}
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still queued or half-batched."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._direct:
+            await asyncio.gather(*self._direct, return_exceptions=True)
+        if self._queue is not None:
+            # Cancelled while collecting or writing a batch: it is written again
+            # here, and rows that already landed come back as duplicates
+            pending, self._batch = self._batch, []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            if pending:
+                print(f"History Writer: Flushing {len(pending)} documents on shutdown")
+                await self._write(pending)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, document: Document):
+        """Queue a document for insertion. Never blocks the caller."""
+        if document.id is None:
+            document.id = PydanticObjectId()
+        if self._queue is None:
+            # Not started (scripts, tests): write straight away in the background
+            self._write_soon(document)
+            return
+        try:
+            self._queue.put_nowait(document)
+            self.stats["queued"] += 1
+        except asyncio.QueueFull:
+            # Mongo is falling behind; write this one on its own rather than lose it
+            self._write_soon(document)
+
+    def _write_soon(self, document: Document):
+        """Write one document in the background; stop() waits for it."""
+        self.stats["direct"] += 1
+        task = asyncio.get_running_loop().create_task(self._write([document]))
+        self._direct.add(task)
+        task.add_done_callback(self._direct.discard)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # The batch lives on self until it is written, so a cancellation at
+            # any await below leaves it for stop() to flush
+            self._batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                # Not wait_for: on Python 3.11 it swallows a cancellation that
+                # arrives just as get() returns, and stop() would hang
+                try:
+                    async with asyncio.timeout(timeout):
+                        self._batch.append(await self._queue.get())
+                except TimeoutError:
+                    break
+            await self._write(self._batch)
+            self._batch = []
+
+    async def _write(self, documents: List[Document]):
+        by_model: Dict[Type[Document], List[Document]] = defaultdict(list)
+        for document in documents:
+            by_model[type(document)].append(document)
+        for model, batch in by_model.items():
+            await self._insert(model, batch)
+
+    async def _insert(self, model: Type[Document], batch: List[Document]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await model.insert_many(batch, ordered=False)
+                break
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if all(error.get("code") == DUPLICATE_KEY for error in errors):
+                    # Written by an earlier attempt that lost its connection
+                    break
+                print(f"History Writer: {len(errors)} {model.__name__} documents rejected: {errors[:1]}")
+                self.stats["dropped"] += len(errors)
+                self.stats["written"] += len(batch) - len(errors)
+                self.stats["batches"] += 1
+                return
+            except (ConnectionFailure, OperationFailure) as e:
+                transient = isinstance(e, ConnectionFailure) or e.has_error_label("RetryableWriteError")
+                if not transient or attempt == self.max_retries:
+                    print(f"History Writer: Giving up on {len(batch)} {model.__name__} documents: {e}")
+                    self.stats["dropped"] += len(batch)
+                    return
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 10.0))
+            except Exception as e:
+                print(f"History Writer: Error writing {len(batch)} {model.__name__} documents: {e}")
+                self.stats["dropped"] += len(batch)
+                return
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+
+
+history_writer = HistoryWriter(
+    settings.HISTORY_BATCH_SIZE,
+    settings.HISTORY_FLUSH_INTERVAL,
+    settings.HISTORY_QUEUE_SIZE,
+    settings.HISTORY_MAX_RETRIES,
+)
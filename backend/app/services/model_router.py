@@ -0,0 +1,226 @@
+"""
+Model router - picks the model for each kind of LLM call, bounds its latency
+and keeps per-model latency/error stats.
+
+Every task class has a route: an ordered model list (first = primary) and a
+latency budget. `run(task, call)` calls `call(model)` with the primary and:
+
+- if it fails, moves straight on to the next model;
+- if it is still running after its usual latency (the route's percentile of
+  that model's recent calls, or `hedge_after` until there is enough history),
+  starts the next model alongside it and takes whichever answers first;
+- gives up with TimeoutError once the budget is spent.
+
+`stream(task, open_stream)` is the streaming counterpart. A stream cannot be
+hedged once text is flowing, so the route's models are only tried in order
+until one starts producing output.
+
+`call` does the provider-specific work, so all models in a route must be
+callable the same way (same provider). Routes can be overridden per task via
+the MODEL_ROUTES setting.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Route:
+    models: List[str]
+    budget: float  # Seconds for the whole call, hedges and fallbacks included
+    hedge_after: float  # Seconds before hedging while a model has too little history
+    hedge_percentile: float = 0.95
+    max_parallel: int = 2  # Primary plus at most this many - 1 hedges at once
+
+
+DEFAULT_ROUTES: Dict[str, Route] = {
+    "analysis": Route(["gemini-3-pro-preview", "gemini-2.5-flash"], budget=120.0, hedge_after=45.0),
+    "moderation": Route(["models/gemini-2.5-flash-lite", "gemini-2.0-flash-lite"], budget=8.0, hedge_after=3.0),
+    "media_moderation": Route(["gemini-2.5-flash-lite", "gemini-1.5-flash"], budget=20.0, hedge_after=8.0),
+    "caption_validation": Route(["gemini-2.0-flash-lite", "models/gemini-2.5-flash-lite"], budget=8.0, hedge_after=3.0),
+    "news": Route(["gemini-2.0-flash-exp", "gemini-1.5-flash"], budget=45.0, hedge_after=20.0),
+    "chat": Route(["gpt-4o", "gpt-4o-mini"], budget=45.0, hedge_after=15.0),
+    "openai_moderation": Route(["gpt-4o-mini"], budget=10.0, hedge_after=5.0),
+    "openai_media_moderation": Route(["gpt-5-nano-2025-08-07", "gpt-4o-mini"], budget=20.0, hedge_after=8.0),
+}
+
+# Latency samples kept per model, and how many are needed before trusting the percentile
+WINDOW = 200
+MIN_SAMPLES = 20
+
+
+class ModelStats:
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0  # Lost a hedge race or ran out of budget
+        self.hedges = 0  # Started as a hedge
+        self.wins = 0  # Answered first
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+            "cancelled": self.cancelled,
+            "hedges": self.hedges,
+            "wins": self.wins,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class ModelRouter:
+    def __init__(self, routes: Dict[str, Route], overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.routes = dict(routes)
+        for task, fields in (overrides or {}).items():
+            base = self.routes.get(task)
+            self.routes[task] = replace(base, **fields) if base else Route(**fields)
+        self._stats: Dict[str, ModelStats] = {}
+
+    def models(self, task: str) -> List[str]:
+        return self.routes[task].models
+
+    def _stats_for(self, model: str) -> ModelStats:
+        if model not in self._stats:
+            self._stats[model] = ModelStats()
+        return self._stats[model]
+
+    def record(self, model: str, seconds: float, ok: bool):
+        """Record a call made outside run(), such as a stream's time to first chunk."""
+        stats = self._stats_for(model)
+        stats.calls += 1
+        if ok:
+            stats.latencies.append(seconds)
+            stats.wins += 1
+        else:
+            stats.errors += 1
+
+    def _hedge_delay(self, route: Route, model: str) -> float:
+        usual = self._stats_for(model).percentile(route.hedge_percentile)
+        return usual if usual is not None else route.hedge_after
+
+    async def run(self, task: str, call: Callable[[str], Awaitable[T]]) -> T:
+        """Call `call(model)` along the task's route; returns the first successful result."""
+        route = self.routes[task]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + route.budget
+        waiting = list(route.models)
+        running: Dict[asyncio.Task, tuple] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch(hedge: bool):
+            model = waiting.pop(0)
+            stats = self._stats_for(model)
+            stats.calls += 1
+            if hedge:
+                stats.hedges += 1
+                print(f"Model Router: {task} hedging with {model}")
+            running[asyncio.ensure_future(call(model))] = (model, time.perf_counter())
+
+        launch(hedge=False)
+        try:
+            while running:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"{task} exceeded its {route.budget}s budget")
+
+                timeout = remaining
+                if waiting and len(running) < route.max_parallel:
+                    newest_model, newest_started = list(running.values())[-1]
+                    hedge_at = self._hedge_delay(route, newest_model) - (time.perf_counter() - newest_started)
+                    timeout = max(0.0, min(timeout, hedge_at))
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if waiting and len(running) < route.max_parallel and loop.time() < deadline:
+                        launch(hedge=True)
+                    continue
+
+                for finished in done:
+                    model, started = running.pop(finished)
+                    stats = self._stats_for(model)
+                    if finished.exception() is None:
+                        stats.latencies.append(time.perf_counter() - started)
+                        stats.wins += 1
+                        return finished.result()
+                    stats.errors += 1
+                    last_error = finished.exception()
+                    print(f"Model Router: {task} model {model} failed: {last_error}")
+
+                # A failed model is replaced by the next one straight away
+                if waiting and len(running) < route.max_parallel:
+                    launch(hedge=False)
+        finally:
+            for pending, (model, _) in running.items():
+                pending.cancel()
+                self._stats_for(model).cancelled += 1
+
+        raise last_error or RuntimeError(f"No models configured for {task}")
+
+    async def stream(self, task: str, open_stream: Callable[[str], AsyncIterator[Optional[str]]]) -> AsyncIterator[str]:
+        """
+        Yield the text of `open_stream(model)` along the task's route, skipping
+        empty pieces. A model that fails before its first output is replaced
+        by the next one, unless the route's budget is already spent; the time
+        to first output is recorded as its latency. A stream that breaks off
+        after some output just ends there, and the caller keeps what it has.
+        Raises the last error if no model produced any output.
+        """
+        route = self.routes[task]
+        first_started = time.perf_counter()
+        error: Optional[BaseException] = None
+        for model in route.models:
+            if time.perf_counter() - first_started > route.budget:
+                error = asyncio.TimeoutError(f"{task} exceeded its {route.budget}s budget")
+                break
+            started = time.perf_counter()
+            streaming = False
+            try:
+                # aclosing: if our caller stops early, the provider slot is released now
+                async with aclosing(open_stream(model)) as pieces:
+                    async for text in pieces:
+                        if not text:
+                            continue
+                        if not streaming:
+                            streaming = True
+                            self.record(model, time.perf_counter() - started, ok=True)
+                        yield text
+                if not streaming:
+                    self.record(model, time.perf_counter() - started, ok=True)
+                return
+            except Exception as e:
+                if streaming:
+                    print(f"Model Router: {task} stream with {model} broke off: {e}")
+                    return
+                error = e
+                self.record(model, time.perf_counter() - started, ok=False)
+                print(f"Model Router: {task} stream with {model} failed before any output: {e}")
+        raise error or RuntimeError(f"No models configured for {task}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": {
+                task: {"models": route.models, "budget": route.budget, "hedge_after": route.hedge_after}
+                for task, route in self.routes.items()
+            },
+            "models": {model: stats.snapshot() for model, stats in self._stats.items()},
+        }
+
+
+model_router = ModelRouter(DEFAULT_ROUTES, settings.MODEL_ROUTES)
@@ -0,0 +1,64 @@
+"""
+Model artifact store - persists fitted price models on disk so workers load them
+instead of retraining on every cold start.
+
+Artifacts are keyed by a hash of the training data plus the hyperparameters, so a
+changed CSV or a changed setting produces a new artifact and old ones stay valid
+for whoever still references them.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import joblib
+import sklearn
+
+
+class ModelStore:
+    """Content-addressed store for serialized sklearn estimators."""
+
+    def __init__(self, artifact_dir: str):
+        self.artifact_dir = artifact_dir
+
+    @staticmethod
+    def artifact_key(name: str, data_hash: str, params: Dict[str, Any]) -> str:
+        """Key for a model trained on `data_hash` with `params`."""
+        digest = hashlib.sha256()
+        digest.update(data_hash.encode())
+        # Pickled estimators are only guaranteed to load on the version that wrote them
+        digest.update(sklearn.__version__.encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return f"{name.lower()}-{digest.hexdigest()[:16]}"
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.artifact_dir, f"{key}.joblib")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def load(self, key: str) -> Optional[Any]:
+        """Load an artifact memory-mapped, or None if it is missing or unreadable."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return joblib.load(path, mmap_mode="r")
+        except Exception as e:
+            print(f"Model Store: Could not load {path}: {e}")
+            return None
+
+    def save(self, key: str, model: Any) -> str:
+        """Write an artifact atomically so concurrent workers never see a partial file."""
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.artifact_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return path
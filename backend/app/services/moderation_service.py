@@ -1,9 +1,38 @@
-from openai import OpenAI
+import asyncio
 from app.core.config import settings
+from app.services.model_router import model_router
+from app.services.openai_client import openai_client, openai_slot
+from app.services.video_frames import extract_video_frames
+
+TEXT_MODERATION_PROMPT = """You are a content moderator for an agricultural community chat.
+You must determine if a message is related to agriculture or farming.
+
+ALLOWED topics:
+- Crops, seeds, planting, harvesting
+- Weather, climate, seasons
+- Soil, fertilizers, pesticides
+- Farm equipment, irrigation
+- Market prices, selling produce
+- Government schemes for farmers
+- Animal husbandry, dairy, poultry
+- General greetings and casual farming community talk
+- Sharing farming experiences
+- Questions about farming
+
+NOT ALLOWED:
+- Politics (unless about farm policies)
+- Religion, caste discrimination
+- Violence, abuse, hate speech
+- Spam, advertisements (non-farming)
+- Movies, entertainment gossip
+- Inappropriate content
+
+Respond with ONLY: "ALLOWED" or "NOT_ALLOWED: [brief reason]"
+"""
 
 class ModerationService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = openai_client
     
     async def is_agriculture_related(self, content: str) -> tuple[bool, str]:
         """
@@ -14,45 +43,26 @@ class ModerationService:
             return True, "Empty content"
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a content moderator for an agricultural community chat.
-                        You must determine if a message is related to agriculture or farming.
-                        
-                        ALLOWED topics:
-                        - Crops, seeds, planting, harvesting
-                        - Weather, climate, seasons
-                        - Soil, fertilizers, pesticides
-                        - Farm equipment, irrigation
-                        - Market prices, selling produce
-                        - Government schemes for farmers
-                        - Animal husbandry, dairy, poultry
-                        - General greetings and casual farming community talk
-                        - Sharing farming experiences
-                        - Questions about farming
-                        
-                        NOT ALLOWED:
-                        - Politics (unless about farm policies)
-                        - Religion, caste discrimination
-                        - Violence, abuse, hate speech
-                        - Spam, advertisements (non-farming)
-                        - Movies, entertainment gossip
-                        - Inappropriate content
-                        
-                        Respond with ONLY: "ALLOWED" or "NOT_ALLOWED: [brief reason]"
-                        """
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Check this message: {content}"
-                    }
-                ],
-                temperature=0,
-                max_tokens=50
-            )
+            async def moderate(model: str):
+                async with openai_slot():
+                    return await self.client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": TEXT_MODERATION_PROMPT
+                            },
+                            {
+                                "role": "user",
+                                "content": f"Check this message: {content}"
+                            }
+                        ],
+                        temperature=0,
+                        max_tokens=50,
+                        timeout=settings.OPENAI_MODERATION_TIMEOUT
+                    )
+
+            response = await model_router.run("openai_moderation", moderate)
             
             result = response.choices[0].message.content.strip()
             
@@ -69,18 +79,12 @@ class ModerationService:
 
     async def moderate_media(self, file_content: bytes, mime_type: str) -> tuple[bool, str]:
         """
-        Check if media is agriculture-related using GPT-5-Nano.
+        Check if media is agriculture-related (model router task "openai_media_moderation").
         Returns (is_allowed, reason)
         """
         try:
             import base64
-            import cv2
-            import numpy as np
-            import tempfile
-            import os
 
-            model_name = "gpt-5-nano-2025-08-07"
-            
             prompt_text = """
             Analyze this image/video frame. Is it related to agriculture, farming, crops, rural life, or nature?
             
@@ -93,29 +97,9 @@ class ModerationService:
             images_to_send = []
             
             if mime_type.startswith("video/"):
-                # Extract frames
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-                    tmp.write(file_content)
-                    tmp_path = tmp.name
-                
-                try:
-                    cap = cv2.VideoCapture(tmp_path)
-                    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                    
-                    if total_frames > 0:
-                        # Get 3 frames
-                        indices = [int(total_frames * 0.1), int(total_frames * 0.5), int(total_frames * 0.9)]
-                        for idx in indices:
-                            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-                            ret, frame = cap.read()
-                            if ret:
-                                _, buffer = cv2.imencode('.jpg', frame)
-                                b64_frame = base64.b64encode(buffer).decode('utf-8')
-                                images_to_send.append(b64_frame)
-                    cap.release()
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
+                # Decoding video is CPU work; keep it off the event loop
+                frames = await asyncio.to_thread(extract_video_frames, file_content)
+                images_to_send.extend(base64.b64encode(frame).decode('utf-8') for frame in frames)
                         
                 if not images_to_send:
                     return False, "Could not extract frames from video"
@@ -134,19 +118,24 @@ class ModerationService:
                     }
                 })
                 
-            response = self.client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content_blocks
-                    }
-                ],
-                max_tokens=10
-            )
+            async def moderate(model: str):
+                async with openai_slot():
+                    return await self.client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": content_blocks
+                            }
+                        ],
+                        max_tokens=10,
+                        timeout=settings.OPENAI_MODERATION_TIMEOUT
+                    )
+
+            response = await model_router.run("openai_media_moderation", moderate)
             
             result = response.choices[0].message.content.strip().upper()
-            print(f"Moderation Result ({model_name}): {result}")
+            print(f"Moderation Result: {result}")
             
             if "YES" in result:
                 return True, "Allowed"
@@ -0,0 +1,25 @@
+"""
+Shared OpenAI client.
+
+One AsyncOpenAI instance per process keeps a single pooled HTTP connection
+set for chat, moderation and Whisper. Calls go through `openai_slot()`, the
+OpenAI provider guard (concurrency limit and circuit breaker, see
+resilience.py), so a burst queues here instead of tripping provider rate
+limits. Each call also passes its own timeout.
+"""
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+from app.services.resilience import providers
+
+openai_client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=10.0),
+    max_retries=settings.OPENAI_MAX_RETRIES,
+)
+
+
+def openai_slot():
+    """Hold while a request is in flight: `async with openai_slot(): ...`"""
+    return providers["openai"].slot()
@@ -1,9 +1,14 @@
-import pandas as pd
 import numpy as np
-from sklearn.tree import DecisionTreeRegressor
-import random
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.services.model_store import ModelStore
+from app.services.dataset_store import DatasetStore, build as build_dataset, append_observations, refresh_series
+from app.services import training_pipeline
+from app.services.training_pipeline import MODEL_KINDS, artifact_name
 
 # Base prices (from the original repo)
 BASE_PRICES = {
@@ -17,16 +22,55 @@ BASE_PRICES = {
 # Annual rainfall (from the original repo)
 ANNUAL_RAINFALL = [29, 21, 37.5, 30.7, 52.6, 150, 299, 251.7, 179.2, 70.5, 39.8, 10.9]
 
+# Months served by /predict/{crop} and the /analyze forecast block
+FORECAST_HORIZON = 6
+
 class CommodityModel:
-    def __init__(self, csv_path):
-        self.name = os.path.basename(csv_path).split('.')[0]
-        dataset = pd.read_csv(csv_path)
-        self.X = dataset.iloc[:, :-1].values
-        self.Y = dataset.iloc[:, 3].values
-        
-        depth = random.randrange(7, 18)
-        self.regressor = DecisionTreeRegressor(max_depth=depth)
-        self.regressor.fit(self.X, self.Y)
+    def __init__(self, name, dataset: DatasetStore, store: Optional[ModelStore] = None, pinned: Optional[Dict[str, str]] = None):
+        self.name = name
+        # kind -> artifact key actually served, as recorded in releases
+        self.artifacts: Dict[str, Optional[str]] = {}
+        self.regressor = self._load_or_fit("tree", dataset, store, (pinned or {}).get("tree"))
+        self.ensemble = self._load_or_fit("ensemble", dataset, store, (pinned or {}).get("ensemble"))
+
+        # Leaf values of every bagged tree, padded into one matrix so all trees
+        # are evaluated with a single gather
+        trees = [estimator.tree_ for estimator in self.ensemble.estimators_]
+        self._leaf_values = np.zeros((len(trees), max(tree.node_count for tree in trees)))
+        for i, tree in enumerate(trees):
+            self._leaf_values[i, :tree.node_count] = tree.value[:, 0, 0]
+
+    def _load_or_fit(self, kind, dataset: DatasetStore, store: Optional[ModelStore], pinned: Optional[str] = None):
+        """
+        Load the artifact pinned by the current release; without one, reuse the
+        persisted model when the series and hyperparameters are unchanged.
+        """
+        if store and pinned:
+            model = store.load(pinned)
+            if model is not None:
+                self.artifacts[kind] = pinned
+                return model
+            print(f"Prediction: Pinned {kind} artifact {pinned} for {self.name} is missing, using current data")
+
+        params_for, fit = MODEL_KINDS[kind]
+        params = params_for()
+        key = None
+        if store:
+            key = store.artifact_key(artifact_name(self.name, kind), dataset.entry(self.name)["source_hash"], params)
+            self.artifacts[kind] = key
+            model = store.load(key)
+            if model is not None:
+                return model
+
+        # Training data comes straight from the shared memory map and is not kept
+        X, y = dataset.training_data(self.name)
+        model = fit(X, y, params)
+        if store:
+            try:
+                store.save(key, model)
+            except Exception as e:
+                print(f"Could not persist {kind} model for {self.name}: {e}")
+        return model
 
     def predict(self, month, year, rainfall):
         if year >= 2019:
@@ -36,54 +80,348 @@ class CommodityModel:
             # Fallback for historical data if needed (simplified from original)
             return 0 
 
+    def predict_many(self, features: np.ndarray) -> np.ndarray:
+        """Predict WPI for an (n, 3) Month/Year/Rainfall matrix in a single tree call."""
+        wpi = np.zeros(len(features))
+        recent = features[:, 1] >= 2019
+        if recent.any():
+            wpi[recent] = self.regressor.predict(features[recent])
+        return wpi
+
+    def predict_ensemble(self, features: np.ndarray, quantiles: Tuple[float, ...]) -> np.ndarray:
+        """
+        Quantiles of the bagged trees' WPI predictions, shape (len(quantiles), n).
+        apply() finds every tree's leaf for every row (sklearn still visits the
+        trees one by one through joblib), then a single gather over the padded
+        leaf values and np.quantile reduce them. That skips the per-tree
+        predict() validation and output copies, but it is not a tree-free path.
+        """
+        stats = np.zeros((len(quantiles), len(features)))
+        recent = features[:, 1] >= 2019
+        if recent.any():
+            leaves = self.ensemble.apply(features[recent])  # (rows, trees)
+            per_tree = self._leaf_values[np.arange(leaves.shape[1]), leaves]
+            stats[:, recent] = np.quantile(per_tree, quantiles, axis=1)
+        return stats
+
 class PredictionService:
     def __init__(self):
-        self.models = {}
-        self.data_dir = "app/data"
-        self._load_models()
+        # Fitted models in least-recently-used order; bounded in lazy mode
+        self.models = OrderedDict()
+        # crop name -> series name, known without loading anything
+        self.manifest = {}
+        self.data_dir = settings.PREDICTION_DATA_DIR
+        self.dataset = DatasetStore(settings.PREDICTION_SERIES_DIR)
+        self.store = ModelStore(settings.MODEL_ARTIFACT_DIR)
+        self.lazy = settings.PREDICTION_LAZY_LOADING
+        self.max_resident = settings.PREDICTION_MAX_RESIDENT_MODELS
+        self._models_lock = threading.Lock()
+        # One lock per crop while its model is being built, so a cold load only
+        # makes requests for that crop wait
+        self._build_locks: Dict[str, threading.Lock] = {}
+        # Bumped by reload(); a model built against an older generation is not installed
+        self._generation = 0
+        # Serializes everything that rewrites the dataset or publishes a release
+        self._ingest_lock = threading.Lock()
+        self._retrain_lock = threading.Lock()
+        # Release manifest (current.json) whose artifacts are served; None before the first release
+        self.release = training_pipeline.current_release(self.store.artifact_dir)
+        self.default_quantiles = tuple(sorted(settings.PREDICTION_QUANTILES))
+        # ((year, month), {(crop, quantiles): forecast}) - replaced as a whole at month rollover.
+        # quantiles is None for the point forecast.
+        self._forecast_table = None
+        self._table_lock = threading.Lock()
+        # Bumped (under _table_lock) whenever a crop's model changes - per crop by
+        # ingest(), for all crops by reload() - so a forecast computed with the old
+        # model is never written back into the table
+        self._crop_generations: Dict[str, int] = {}
+        self._table_epoch = 0
+        self.training_status = {"state": "idle", "version": None, "error": None}
+        self._build_manifest()
+        if not self.lazy:
+            self._load_models()
+        self._current_table()
 
-    def _load_models(self):
+    def _build_manifest(self):
         if not os.path.exists(self.data_dir):
             print(f"Data directory {self.data_dir} not found.")
             return
 
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith(".csv"):
-                path = os.path.join(self.data_dir, filename)
-                model = CommodityModel(path)
-                self.models[model.name.lower()] = model
+        # Refresh the shared series for any CSV that changed; unchanged ones are skipped
+        try:
+            self.dataset.refresh(build_dataset(self.data_dir, self.dataset.series_dir))
+        except Exception as e:
+            print(f"Could not build dataset, using existing index: {e}")
+            self.dataset.refresh()
 
-    def get_supported_crops(self):
-        return list(self.models.keys())
+        self.manifest = {key: self.dataset.entry(key)["name"] for key in self.dataset.names()}
+
+    @staticmethod
+    def _pinned(release: Optional[Dict], crop_name: str) -> Optional[Dict[str, str]]:
+        return (release or {}).get("models", {}).get(crop_name)
 
-    def get_forecast(self, crop_name):
+    def _load_models(self):
+        for key, name in self.manifest.items():
+            self.models[key] = CommodityModel(name, self.dataset, self.store, self._pinned(self.release, key))
+
+    def get_model(self, crop_name) -> Optional[CommodityModel]:
+        """Return a crop's model, materializing it on first use in lazy mode."""
         crop_name = crop_name.lower()
-        if crop_name not in self.models:
+        if crop_name not in self.manifest:
             return None
 
-        model = self.models[crop_name]
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        
-        forecasts = []
-        for i in range(1, 7): # Next 6 months
-            if current_month + i <= 12:
-                m, y = current_month + i, current_year
-                r = ANNUAL_RAINFALL[m - 1]
+        model = self._resident_model(crop_name)
+        if model is not None:
+            return model
+
+        with self._models_lock:
+            build_lock = self._build_locks.setdefault(crop_name, threading.Lock())
+        with build_lock:
+            # Someone else may have built it while we waited
+            model = self._resident_model(crop_name)
+            if model is not None:
+                return model
+
+            generation = self._generation
+            model = CommodityModel(self.manifest[crop_name], self.dataset, self.store, self._pinned(self.release, crop_name))
+            with self._models_lock:
+                if generation == self._generation:
+                    self._install_model(crop_name, model)
+            return model
+
+    def _resident_model(self, crop_name) -> Optional[CommodityModel]:
+        with self._models_lock:
+            model = self.models.get(crop_name)
+            if model is not None:
+                self.models.move_to_end(crop_name)
+            return model
+
+    def _install_model(self, crop_name, model):
+        """Put a model in the resident set, evicting the least recently used in lazy mode. Caller holds _models_lock."""
+        self.models[crop_name] = model
+        self.models.move_to_end(crop_name)
+        if self.lazy:
+            while len(self.models) > self.max_resident:
+                evicted, _ = self.models.popitem(last=False)
+                print(f"Prediction: Evicted model for {evicted}")
+
+    def ingest(self, crop_name, rows):
+        """
+        Append (month, year, rainfall, wpi) observations for one crop, refit only
+        that crop and swap it in. Other crops' models and cached forecasts are
+        untouched. Blocking; run it as a background task.
+        """
+        crop_name = crop_name.lower()
+        if crop_name not in self.manifest:
+            raise KeyError(crop_name)
+
+        with self._ingest_lock:
+            entry = self.dataset.entry(crop_name)
+            append_observations(os.path.join(self.data_dir, entry["source"]), rows)
+            self.dataset.refresh(refresh_series(self.data_dir, self.dataset.series_dir, crop_name))
+
+            # Fitted outside _models_lock so other crops keep being served meanwhile
+            model = CommodityModel(self.manifest[crop_name], self.dataset, self.store)
+
+            # Pin the refit in a new release, or the next reload would go back to the old artifact
+            if self.release is not None:
+                release = {k: v for k, v in self.release.items() if k not in ("version", "created_at")}
+                release["models"] = {**self.release.get("models", {}), crop_name: model.artifacts}
+                release["trained"] = {crop_name: list(MODEL_KINDS)}
+                release["ingested_rows"] = {crop_name: len(rows)}
+                self.release = training_pipeline.publish(self.store.artifact_dir, release)
+
+        with self._models_lock:
+            self._install_model(crop_name, model)
+
+        # Only this crop's cached forecasts are dropped; they are recomputed on next request.
+        # Readers keep the dict they hold; a filtered copy is installed in its place
+        with self._table_lock:
+            self._crop_generations[crop_name] = self._crop_generations.get(crop_name, 0) + 1
+            table = self._forecast_table
+            if table is not None:
+                self._forecast_table = (table[0], {k: v for k, v in table[1].items() if k[0] != crop_name})
+        print(f"Prediction: Ingested {len(rows)} rows for {crop_name} and swapped its model")
+
+    def reload(self):
+        """
+        Swap in the models named by the current release (current.json), or the
+        ones matching the current dataset where no release pins them. New
+        models are loaded off to the side and installed with one assignment,
+        so requests keep using the previous ones until the swap.
+        """
+        self.dataset.refresh()
+        release = training_pipeline.current_release(self.store.artifact_dir)
+        manifest = {key: self.dataset.entry(key)["name"] for key in self.dataset.names()}
+        models = OrderedDict()
+        if not self.lazy:
+            for key, name in manifest.items():
+                models[key] = CommodityModel(name, self.dataset, self.store, self._pinned(release, key))
+
+        with self._models_lock:
+            self.release = release
+            self.manifest = manifest
+            self.models = models
+            self._generation += 1
+        with self._table_lock:
+            self._table_epoch += 1
+            self._forecast_table = None
+
+    def retrain(self, crops: Optional[List[str]] = None, force: bool = False):
+        """
+        Run the parallel training pipeline and hot-swap the result. Blocking;
+        call it from a thread or background task so requests keep being served.
+        """
+        if not self._retrain_lock.acquire(blocking=False):
+            return self.training_status
+
+        try:
+            self.training_status = {"state": "running", "version": None, "error": None}
+            with self._ingest_lock:
+                release = training_pipeline.run(
+                    data_dir=self.data_dir,
+                    series_dir=self.dataset.series_dir,
+                    artifact_dir=self.store.artifact_dir,
+                    crops=crops,
+                    force=force
+                )
+            self.reload()
+            self.training_status = {"state": "idle", "version": release["version"], "error": None}
+        except Exception as e:
+            print(f"Prediction: Retraining failed: {e}")
+            self.training_status = {"state": "failed", "version": None, "error": str(e)}
+        finally:
+            self._retrain_lock.release()
+        return self.training_status
+
+    def activate(self, version: str):
+        """Serve an earlier release again (rollback). Raises KeyError for an unknown version."""
+        with self._ingest_lock:
+            training_pipeline.activate(self.store.artifact_dir, version)
+        self.reload()
+        return self.release
+
+    def get_supported_crops(self):
+        return list(self.manifest.keys())
+
+    @staticmethod
+    def horizon_features(horizon: int, now: Optional[datetime] = None) -> np.ndarray:
+        """Month/Year/Rainfall rows for the `horizon` months after `now`."""
+        now = now or datetime.now()
+        months_ahead = now.month - 1 + np.arange(1, horizon + 1)
+        months = months_ahead % 12 + 1
+        years = now.year + months_ahead // 12
+        rainfall = np.asarray(ANNUAL_RAINFALL)[months - 1]
+        return np.column_stack([months, years, rainfall])
+
+    def get_forecasts(
+        self,
+        crop_names: Iterable[str],
+        horizon: int = FORECAST_HORIZON,
+        now: Optional[datetime] = None,
+        quantiles: Optional[Tuple[float, ...]] = None
+    ) -> Dict[str, List[dict]]:
+        """
+        Forecast several crops at once. The feature matrix and month labels are
+        built once and each crop's model is evaluated in a single batched call.
+        With `quantiles`, "price"/"wpi" are the ensemble median and each month
+        also carries the requested bands. Unknown crops are left out of the result.
+        """
+        features = self.horizon_features(horizon, now)
+        labels = [datetime(int(y), int(m), 1).strftime("%b %Y") for m, y in features[:, :2]]
+        band_names = [f"p{q * 100:g}" for q in quantiles] if quantiles else []
+
+        results = {}
+        for crop_name in crop_names:
+            crop_name = crop_name.lower()
+            model = self.get_model(crop_name)
+            if model is None:
+                continue
+
+            if quantiles:
+                wpi = model.predict_ensemble(features, (0.5,) + tuple(quantiles))
             else:
-                m, y = current_month + i - 12, current_year + 1
-                r = ANNUAL_RAINFALL[m - 1]
-            
-            predicted_wpi = model.predict(m, y, r)
+                wpi = model.predict_many(features)[np.newaxis, :]
             base_price = BASE_PRICES.get(crop_name.capitalize(), 1000) # Default base if not found
-            estimated_price = (predicted_wpi * base_price) / 100
-            
-            forecasts.append({
-                "month": datetime(y, m, 1).strftime("%b %Y"),
-                "price": round(estimated_price, 2),
-                "wpi": round(predicted_wpi, 2)
-            })
-            
-        return forecasts
+            prices = np.round(wpi * base_price / 100, 2)
+            wpi = np.round(wpi, 2)
+
+            forecast = []
+            for month, label in enumerate(labels):
+                entry = {"month": label, "price": float(prices[0, month]), "wpi": float(wpi[0, month])}
+                if band_names:
+                    entry["bands"] = {
+                        name: {"price": float(prices[i + 1, month]), "wpi": float(wpi[i + 1, month])}
+                        for i, name in enumerate(band_names)
+                    }
+                forecast.append(entry)
+            results[crop_name] = forecast
+        return results
+
+    def _current_table(self) -> Dict[Tuple[str, Optional[Tuple[float, ...]]], List[dict]]:
+        """
+        Forecasts depend only on the crop and the current month, so they are
+        computed for every crop once per calendar month. A new table is built
+        on the first call after rollover and swapped in with a single assignment;
+        readers holding the old table are unaffected. In lazy mode the table
+        starts empty and is filled as crops are requested.
+        """
+        now = datetime.now()
+        period = (now.year, now.month)
+        table = self._forecast_table
+        if table is None or table[0] != period:
+            with self._table_lock:
+                table = self._forecast_table
+                if table is None or table[0] != period:
+                    crops = [] if self.lazy else list(self.manifest.keys())
+                    entries = {}
+                    for quantiles in (None, self.default_quantiles):
+                        for crop, forecast in self.get_forecasts(crops, now=now, quantiles=quantiles).items():
+                            entries[(crop, quantiles)] = forecast
+                    table = (period, entries)
+                    self._forecast_table = table
+        return table[1]
+
+    def lookup_forecasts(self, crop_names: Iterable[str], quantiles: Optional[Tuple[float, ...]] = None) -> Dict[str, List[dict]]:
+        """
+        Six-month forecasts for several crops; pass `quantiles` for the ensemble
+        median and bands. The point forecast and the default bands are served
+        from the monthly table and any misses are computed in one batch; other
+        quantiles are always computed on demand.
+        """
+        crop_names = [c.lower() for c in crop_names]
+        quantiles = tuple(quantiles) if quantiles else None
+        if quantiles not in (None, self.default_quantiles):
+            return self.get_forecasts(crop_names, quantiles=quantiles)
+
+        table = self._current_table()
+        results, missing = {}, []
+        for crop_name in crop_names:
+            forecast = table.get((crop_name, quantiles))
+            if forecast is not None:
+                results[crop_name] = forecast
+            elif crop_name in self.manifest:
+                missing.append(crop_name)
+
+        if missing:
+            with self._table_lock:
+                epoch = self._table_epoch
+                generations = {crop: self._crop_generations.get(crop, 0) for crop in missing}
+            computed = self.get_forecasts(missing, quantiles=quantiles)
+            with self._table_lock:
+                current = self._forecast_table
+                for crop_name, forecast in computed.items():
+                    results[crop_name] = forecast
+                    # Skip the write-back if the crop's model was swapped while we computed
+                    if (
+                        current is not None
+                        and epoch == self._table_epoch
+                        and generations[crop_name] == self._crop_generations.get(crop_name, 0)
+                    ):
+                        current[1][(crop_name, quantiles)] = forecast
+        return results
+
+    def get_forecast(self, crop_name, quantiles: Optional[Tuple[float, ...]] = None):
+        return self.lookup_forecasts([crop_name], quantiles).get(crop_name.lower())
 
 prediction_service = PredictionService()
@@ -0,0 +1,202 @@
+"""
+Per-provider resilience layer for outbound integrations.
+
+Every external provider (Gemini, OpenAI, Sarvam, Hugging Face, Nominatim) has
+one ProviderGuard per process. Calls go through `async with guard.slot():`,
+which
+
+- limits in-flight calls to the provider (a semaphore) and sheds a call that
+  cannot get a slot within PROVIDER_QUEUE_TIMEOUT seconds (ProviderBusy);
+- runs a circuit breaker: after CIRCUIT_FAILURE_THRESHOLD consecutive
+  failures the circuit opens and calls fail immediately with CircuitOpen for
+  CIRCUIT_RESET_SECONDS, then a single probe call decides whether it closes;
+- optionally spaces call starts at least `min_interval` seconds apart, for
+  providers with a request-rate policy (Nominatim);
+- counts waiting and in-flight calls, so queue depth is visible in metrics.
+
+Only provider-side trouble trips the breaker: timeouts and transport errors
+from httpx, openai and google-genai, and HTTP 429 and 5xx. A 4xx caused by our
+own request does not, and neither does a bug in our own code.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+import httpx
+import openai
+from google.genai import errors as genai_errors
+
+from app.core.config import settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """Base for calls refused by the resilience layer without reaching the provider."""
+
+
+class CircuitOpen(ProviderUnavailable):
+    pass
+
+
+class ProviderBusy(ProviderUnavailable):
+    pass
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Whether an error says the provider is unhealthy (as opposed to a bad request)."""
+    # Timeouts and connection failures (openai's APITimeoutError is an APIConnectionError)
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TransportError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+    elif isinstance(exc, openai.APIStatusError):
+        status = exc.status_code
+    elif isinstance(exc, genai_errors.APIError):
+        status = exc.code
+    else:
+        # Anything else (a parse error, a KeyError in our code) is not the provider's fault
+        return False
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def raise_for_provider_status(response: httpx.Response):
+    """
+    Raise on 429 and 5xx only, for callers that handle other statuses
+    themselves, so the circuit breaker still sees provider-side trouble.
+    """
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+
+
+class ProviderGuard:
+    def __init__(self, name: str, max_concurrency: int, failure_threshold: int, reset_seconds: float, queue_timeout: float, min_interval: float = 0.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.queue_timeout = queue_timeout
+        self.min_interval = min_interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._next_start = 0.0
+
+        self.state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats = {"calls": 0, "failures": 0, "rejected_open": 0, "rejected_busy": 0, "opened": 0}
+
+    def _admit(self) -> bool:
+        """Breaker check before queueing. Returns True if this call is the half-open probe."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                self.stats["rejected_open"] += 1
+                raise CircuitOpen(f"{self.name} circuit is open")
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.stats["rejected_open"] += 1
+                raise CircuitOpen(f"{self.name} circuit is half-open, probe in flight")
+            self._probing = True
+            return True
+        return False
+
+    def _record(self, ok: bool, probe: bool):
+        if probe:
+            self._probing = False
+        if ok:
+            self._consecutive_failures = 0
+            if self.state != CLOSED:
+                print(f"Resilience: {self.name} circuit closed")
+            self.state = CLOSED
+            return
+
+        self.stats["failures"] += 1
+        self._consecutive_failures += 1
+        if probe or self._consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats["opened"] += 1
+                print(f"Resilience: {self.name} circuit opened after {self._consecutive_failures} failures")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    async def _pace(self):
+        """Wait for this call's turn under min_interval. Turns are reserved in arrival order."""
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.min_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold for the duration of one provider call."""
+        probe = self._admit()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if probe:
+                self._probing = False
+            self.stats["rejected_busy"] += 1
+            raise ProviderBusy(f"{self.name} has {self.waiting - 1} calls waiting, shedding load")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.stats["calls"] += 1
+        try:
+            if self.min_interval:
+                await self._pace()
+            yield
+        except Exception as e:
+            self._record(not is_provider_failure(e), probe)
+            raise
+        except BaseException:
+            # Cancelled (e.g. a hedge that lost): says nothing about the provider
+            if probe:
+                self._probing = False
+            raise
+        else:
+            self._record(True, probe)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "limit": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "consecutive_failures": self._consecutive_failures,
+            **self.stats,
+        }
+
+
+def _guard(name: str, max_concurrency: int, min_interval: float = 0.0) -> ProviderGuard:
+    return ProviderGuard(
+        name,
+        max_concurrency,
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=settings.CIRCUIT_RESET_SECONDS,
+        queue_timeout=settings.PROVIDER_QUEUE_TIMEOUT,
+        min_interval=min_interval,
+    )
+
+
+providers: Dict[str, ProviderGuard] = {
+    "gemini": _guard("gemini", settings.GEMINI_MAX_CONCURRENCY),
+    "openai": _guard("openai", settings.OPENAI_MAX_CONCURRENCY),
+    "sarvam": _guard("sarvam", settings.SARVAM_MAX_CONCURRENCY),
+    "huggingface": _guard("huggingface", settings.HUGGINGFACE_MAX_CONCURRENCY),
+    "nominatim": _guard("nominatim", settings.NOMINATIM_MAX_CONCURRENCY, settings.NOMINATIM_MIN_INTERVAL),
+}
+
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: guard.snapshot() for name, guard in providers.items()}
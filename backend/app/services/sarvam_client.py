@@ -0,0 +1,32 @@
+"""
+Shared Sarvam AI HTTP client.
+
+Translation (sarvam_service.py) and text-to-speech (tts_service.py) call the
+same host, so they share one pooled httpx client per process: repeat calls
+reuse the TLS connection, and shutdown has a single close to await. Both go
+through the "sarvam" provider guard (see resilience.py) on their own.
+"""
+from typing import Optional
+
+import httpx
+
+
+class SarvamClient:
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Created on first use, and again if it was closed."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+sarvam_client = SarvamClient(timeout=60.0)
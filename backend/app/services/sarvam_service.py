@@ -1,54 +1,148 @@
+import asyncio
 import httpx
 from app.core.config import settings
+from app.services.resilience import providers
+from app.services.sarvam_client import sarvam_client
+from app.services.translation_memory import memory_key, translation_memory
+from typing import List, Optional
 import json
 
 class SarvamService:
     def __init__(self):
         self.api_key = settings.SARVAM_API_KEY
         self.api_url = "https://api.sarvam.ai/translate"
+        self.model = "mayura:v1"
+        self.mode = "formal"
+        # Longest input the translate model accepts in one request
+        self.max_chars = settings.SARVAM_TRANSLATE_MAX_CHARS
+        # Concurrency limit and circuit breaker shared by translate and TTS
+        self._guard = providers["sarvam"]
 
-    async def translate(self, text: str, target_lang: str, source_lang: str = "en-IN") -> str:
-        if not text or not text.strip():
-            return text
-            
-        if not self.api_key:
-            print(f"Sarvam Translation: No API key configured")
-            return text
-        
-        if target_lang == "en-IN" or target_lang == "en":
-            return text
-        
-        print(f"Sarvam Translation: Translating to {target_lang}")
-        print(f"Sarvam Translation: Text length = {len(text)}")
-        
+    async def _request_translation(self, text: str, target_lang: str, source_lang: str) -> str:
+        """One translate API call. Raises on HTTP or network errors."""
         headers = {
             "api-subscription-key": self.api_key,
             "content-type": "application/json"
         }
-        
+
         payload = {
             "input": text,
             "source_language_code": source_lang,
             "target_language_code": target_lang,
-            "mode": "formal",
-            "model": "mayura:v1",
+            "mode": self.mode,
+            "model": self.model,
             "enable_preprocessing": True
         }
 
+        async with self._guard.slot():
+            response = await sarvam_client.client.post(self.api_url, headers=headers, json=payload)
+            response.raise_for_status()
+        data = response.json()
+        return data.get("translated_text", text)
+
+    async def _translate_one(self, text: str, target_lang: str, source_lang: str) -> Optional[str]:
+        """Translate one segment; None on any failure."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.api_url, headers=headers, json=payload, timeout=60.0)
-                response.raise_for_status()
-                data = response.json()
-                translated = data.get("translated_text", text)
-                print(f"Sarvam Translation: Success! Translated length = {len(translated)}")
-                return translated
+            translated = await self._request_translation(text, target_lang, source_lang)
+            print(f"Sarvam Translation: Success! Translated length = {len(translated)}")
+            return translated
         except httpx.HTTPStatusError as e:
             print(f"Sarvam Translation HTTP Error: {e}")
             print(f"Response Body: {e.response.text}")
-            return text
+            return None
         except Exception as e:
             print(f"Sarvam Translation Error: {e}")
+            return None
+
+    def _needs_translation(self, target_lang: str) -> bool:
+        if not self.api_key:
+            print(f"Sarvam Translation: No API key configured")
+            return False
+        return target_lang not in ("en-IN", "en")
+
+    async def translate(self, text: str, target_lang: str, source_lang: str = "en-IN") -> str:
+        if not text or not text.strip():
             return text
 
+        if not self._needs_translation(target_lang):
+            return text
+
+        print(f"Sarvam Translation: Translating to {target_lang}")
+        print(f"Sarvam Translation: Text length = {len(text)}")
+
+        return (await self.translate_batch([text], target_lang, source_lang))[0]
+
+    def _pack(self, segments: List[str]) -> List[List[str]]:
+        """
+        Group single-line segments into newline-joined packs under the provider's
+        input limit. Multi-line or oversized segments travel alone.
+        """
+        packs, current, size = [], [], 0
+        for segment in segments:
+            if "\n" in segment or len(segment) > self.max_chars:
+                packs.append([segment])
+                continue
+            if current and size + len(segment) + 1 > self.max_chars:
+                packs.append(current)
+                current, size = [], 0
+            current.append(segment)
+            size += len(segment) + 1
+        if current:
+            packs.append(current)
+        return packs
+
+    async def _translate_pack(self, pack: List[str], target_lang: str, source_lang: str) -> List[Optional[str]]:
+        if len(pack) == 1:
+            return [await self._translate_one(pack[0], target_lang, source_lang)]
+
+        try:
+            translated = await self._request_translation("\n".join(pack), target_lang, source_lang)
+            lines = translated.split("\n")
+            if len(lines) == len(pack):
+                return [line.strip() for line in lines]
+            print(f"Sarvam Translation: Pack of {len(pack)} came back as {len(lines)} lines, translating individually")
+        except Exception as e:
+            print(f"Sarvam Translation: Pack failed ({e}), translating individually")
+
+        return list(await asyncio.gather(
+            *(self._translate_one(segment, target_lang, source_lang) for segment in pack)
+        ))
+
+    async def translate_batch(self, texts: List[Optional[str]], target_lang: str, source_lang: str = "en-IN") -> List[Optional[str]]:
+        """
+        Translate many segments at once. Segments already in the translation
+        memory are answered from it; of the rest, duplicates are sent once,
+        short segments are packed into shared requests, and the requests run
+        concurrently (bounded by SARVAM_MAX_CONCURRENCY). The result lines up
+        with `texts`; empty or failed segments come back unchanged.
+        """
+        if not self._needs_translation(target_lang):
+            return list(texts)
+
+        model = f"{self.model}/{self.mode}"
+        keys = {t: memory_key(t, source_lang, target_lang, model) for t in texts if t and t.strip()}
+        if not keys:
+            return list(texts)
+
+        remembered = await translation_memory.get_many(keys.values())
+        translations = {t: remembered[k] for t, k in keys.items() if k in remembered}
+        pending = [t for t in keys if t not in translations]
+
+        if pending:
+            packs = self._pack(pending)
+            print(f"Sarvam Translation: Translating {len(pending)} segments to {target_lang} in {len(packs)} requests ({len(translations)} from memory)")
+            results = await asyncio.gather(
+                *(self._translate_pack(pack, target_lang, source_lang) for pack in packs)
+            )
+
+            learned = []
+            for pack, translated in zip(packs, results):
+                for source, result in zip(pack, translated):
+                    if result is not None:
+                        translations[source] = result
+                        learned.append((keys[source], source, result))
+            await translation_memory.put_many(learned, source_lang, target_lang, model)
+
+        return [translations.get(t, t) if t else t for t in texts]
+
 sarvam_service = SarvamService()
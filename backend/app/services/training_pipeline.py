@@ -0,0 +1,210 @@
+"""
+Training pipeline - fits commodity price models in parallel and publishes them
+as a versioned release in the model artifact store.
+
+Each crop is fitted in its own process, so a full retrain takes about as long as
+the slowest crop. Artifacts that already exist for the current data and
+hyperparameters are reused. The web process keeps serving the models it has
+loaded until PredictionService.reload() swaps in the new release.
+
+current.json names the artifact of every crop that is served; releases/ keeps
+every release ever published, so an older one can be made current again.
+
+Run standalone:
+
+    python -m app.services.training_pipeline --workers 4
+    python -m app.services.training_pipeline --activate 20250101120000000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from app.core.config import settings
+from app.services.dataset_store import DatasetStore, build as build_dataset
+from app.services.model_store import ModelStore
+
+RELEASES_DIR = "releases"
+CURRENT_RELEASE = "current.json"
+
+
+def model_params() -> Dict[str, Any]:
+    """Hyperparameters for every commodity tree. Fixed so all workers agree on forecasts."""
+    return {
+        "max_depth": settings.PREDICTION_MAX_DEPTH,
+        "random_state": settings.PREDICTION_RANDOM_STATE,
+    }
+
+
+def fit_model(X, y, params: Dict[str, Any]) -> DecisionTreeRegressor:
+    regressor = DecisionTreeRegressor(**params)
+    regressor.fit(X, y)
+    return regressor
+
+
+def ensemble_params() -> Dict[str, Any]:
+    """Bagged trees (every feature at every split) with the same depth as the point model."""
+    params = model_params()
+    return {
+        "n_estimators": settings.PREDICTION_ENSEMBLE_SIZE,
+        "max_depth": params["max_depth"],
+        "max_features": 1.0,
+        "bootstrap": True,
+        "random_state": params["random_state"],
+    }
+
+
+def fit_ensemble(X, y, params: Dict[str, Any]) -> RandomForestRegressor:
+    # Single-threaded: the pipeline already runs one process per core, and an
+    # in-process refit must not take every core from the API. n_jobs does not
+    # change the result so it stays out of the key
+    forest = RandomForestRegressor(n_jobs=1, **params)
+    forest.fit(X, y)
+    return forest
+
+
+# Artifact kinds trained per crop: kind -> (hyperparameters, fit function)
+MODEL_KINDS = {
+    "tree": (model_params, fit_model),
+    "ensemble": (ensemble_params, fit_ensemble),
+}
+
+
+def artifact_name(name: str, kind: str) -> str:
+    return name if kind == "tree" else f"{name}-{kind}"
+
+
+def train_series(key: str, series_dir: str, artifact_dir: str, params: Dict[str, Dict[str, Any]], force: bool = False) -> Dict[str, Any]:
+    """Fit and persist every model kind for one crop. Runs in a worker process."""
+    dataset = DatasetStore(series_dir)
+    store = ModelStore(artifact_dir)
+    entry = dataset.entry(key)
+    started = time.perf_counter()
+    artifacts, trained = {}, []
+
+    for kind, (_, fit) in MODEL_KINDS.items():
+        artifact = store.artifact_key(artifact_name(entry["name"], kind), entry["source_hash"], params[kind])
+        artifacts[kind] = artifact
+        if not force and store.exists(artifact):
+            continue
+        X, y = dataset.training_data(key)
+        store.save(artifact, fit(X, y, params[kind]))
+        trained.append(kind)
+
+    return {
+        "crop": key,
+        "artifacts": artifacts,
+        "trained": trained,
+        "fit_seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def _write_json(path: str, data: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def current_release(artifact_dir: str) -> Optional[Dict]:
+    path = os.path.join(artifact_dir, CURRENT_RELEASE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def publish(artifact_dir: str, release: Dict[str, Any]) -> Dict[str, Any]:
+    """Stamp a version on `release`, keep it under releases/ and make it current."""
+    release = {"version": datetime.now().strftime("%Y%m%d%H%M%S%f"), "created_at": datetime.now().isoformat(), **release}
+    _write_json(os.path.join(artifact_dir, RELEASES_DIR, f"{release['version']}.json"), release)
+    _write_json(os.path.join(artifact_dir, CURRENT_RELEASE), release)
+    return release
+
+
+def activate(artifact_dir: str, version: str) -> Dict[str, Any]:
+    """Make an earlier release current again (rollback). Raises KeyError if it does not exist."""
+    path = os.path.join(artifact_dir, RELEASES_DIR, f"{os.path.basename(version)}.json")
+    if not os.path.exists(path):
+        raise KeyError(version)
+    with open(path) as f:
+        release = json.load(f)
+    _write_json(os.path.join(artifact_dir, CURRENT_RELEASE), release)
+    print(f"Training Pipeline: Release {version} is current")
+    return release
+
+
+def run(
+    data_dir: Optional[str] = None,
+    series_dir: Optional[str] = None,
+    artifact_dir: Optional[str] = None,
+    crops: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Refresh the dataset, fit every crop (or just `crops`) over a process pool
+    and publish a release manifest. Returns the release.
+    """
+    data_dir = data_dir or settings.PREDICTION_DATA_DIR
+    series_dir = series_dir or settings.PREDICTION_SERIES_DIR
+    artifact_dir = artifact_dir or settings.MODEL_ARTIFACT_DIR
+    workers = workers or settings.TRAINING_WORKERS or None
+    params = {kind: params_for() for kind, (params_for, _) in MODEL_KINDS.items()}
+
+    started = time.perf_counter()
+    index = build_dataset(data_dir, series_dir)
+    keys = [k for k in index["series"] if crops is None or k in crops]
+
+    # Spawned (not forked) workers: the caller may be a threaded web process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(train_series, key, series_dir, artifact_dir, params, force) for key in keys]
+        results = [f.result() for f in futures]
+
+    # Crops outside this run keep the artifact they had in the previous release
+    previous = current_release(artifact_dir) or {}
+    models = dict(previous.get("models", {})) if crops is not None else {}
+    models.update({r["crop"]: r["artifacts"] for r in results})
+
+    release = publish(artifact_dir, {
+        "params": params,
+        "models": models,
+        "trained": {r["crop"]: r["trained"] for r in results if r["trained"]},
+        "fit_seconds": {r["crop"]: r["fit_seconds"] for r in results},
+        "wall_seconds": round(time.perf_counter() - started, 4),
+    })
+    print(f"Training Pipeline: Release {release['version']} - trained {len(release['trained'])}/{len(results)} crops in {release['wall_seconds']}s")
+    return release
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train commodity price models in parallel.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--crop", action="append", dest="crops", help="Only train this crop (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Refit even when an artifact exists")
+    parser.add_argument("--activate", metavar="VERSION", help="Make an earlier release current instead of training")
+    args = parser.parse_args(argv)
+
+    if args.activate:
+        activate(settings.MODEL_ARTIFACT_DIR, args.activate)
+        return
+
+    crops = [c.lower() for c in args.crops] if args.crops else None
+    run(crops=crops, workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
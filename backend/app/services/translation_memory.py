@@ -0,0 +1,111 @@
+"""
+Translation memory - remembers machine translations so repeated strings
+(crop names, scheme boilerplate, the weekly news broadcast) never hit the
+translation API twice.
+
+Two tiers, keyed by a hash of (normalized source text, source language,
+target language, model):
+
+    in-process LRU  ->  MongoDB (TranslationMemoryEntry, expires via a TTL index)
+
+A Mongo lookup that finds an entry promotes it into the LRU. Mongo being down
+or not yet initialised only costs the persistent tier; translation carries on.
+"""
+import asyncio
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from beanie.operators import In, Set
+from cachetools import LRUCache
+
+from app.core.config import settings
+from app.models import TranslationMemoryEntry
+
+
+def normalize(text: str) -> str:
+    """Canonical form used for keys: NFC, trimmed, single spaces within lines."""
+    text = unicodedata.normalize("NFC", text).strip()
+    return "\n".join(re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n"))
+
+
+def memory_key(text: str, source_lang: str, target_lang: str, model: str) -> str:
+    digest = hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+    return f"{model}:{source_lang}:{target_lang}:{digest}"
+
+
+class TranslationMemory:
+    def __init__(self, max_entries: int):
+        self._lru: LRUCache = LRUCache(maxsize=max_entries)
+        self.stats = {"lru_hits": 0, "store_hits": 0, "misses": 0, "writes": 0, "store_errors": 0}
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Known translations for `keys`; keys missing from both tiers are absent."""
+        found, pending = {}, []
+        for key in dict.fromkeys(keys):
+            if key in self._lru:
+                found[key] = self._lru[key]
+            else:
+                pending.append(key)
+        self.stats["lru_hits"] += len(found)
+
+        if pending:
+            try:
+                entries = await TranslationMemoryEntry.find(In(TranslationMemoryEntry.key, pending)).to_list()
+            except Exception as e:
+                print(f"Translation Memory: Store lookup failed: {e}")
+                self.stats["store_errors"] += 1
+                entries = []
+            for entry in entries:
+                self._lru[entry.key] = entry.translated_text
+                found[entry.key] = entry.translated_text
+            self.stats["store_hits"] += len(entries)
+            self.stats["misses"] += len(pending) - len(entries)
+        return found
+
+    async def put_many(self, items: List[Tuple[str, str, str]], source_lang: str, target_lang: str, model: str) -> None:
+        """Remember (key, source_text, translated_text) triples in both tiers."""
+        if not items:
+            return
+        for key, _, translated in items:
+            self._lru[key] = translated
+
+        now = datetime.now()
+        try:
+            # Upsert: another worker may have translated the same string meanwhile
+            await asyncio.gather(*(
+                TranslationMemoryEntry.find_one(TranslationMemoryEntry.key == key).upsert(
+                    Set({
+                        TranslationMemoryEntry.translated_text: translated,
+                        TranslationMemoryEntry.created_at: now,
+                    }),
+                    on_insert=TranslationMemoryEntry(
+                        key=key,
+                        source_lang=source_lang,
+                        target_lang=target_lang,
+                        model=model,
+                        source_text=source,
+                        translated_text=translated,
+                        created_at=now,
+                    ),
+                )
+                for key, source, translated in items
+            ))
+            self.stats["writes"] += len(items)
+        except Exception as e:
+            print(f"Translation Memory: Store write failed: {e}")
+            self.stats["store_errors"] += 1
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.stats["lru_hits"] + self.stats["store_hits"] + self.stats["misses"]
+        hits = self.stats["lru_hits"] + self.stats["store_hits"]
+        return {
+            **self.stats,
+            "lru_size": len(self._lru),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+translation_memory = TranslationMemory(settings.TRANSLATION_MEMORY_MAX_ENTRIES)
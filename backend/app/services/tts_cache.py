@@ -0,0 +1,163 @@
+"""
+Content-addressed cache for synthesized speech.
+
+Each entry is one sentence chunk's WAV. It is keyed by a hash of the
+normalized text and every parameter that changes the audio: language,
+speaker, model, pace and sample rate. Working per chunk (not per whole text)
+has two benefits. A repeated summary hits in full. A reply that merely
+contains a common sentence (the off-topic refusal, a greeting) hits for that
+sentence.
+
+Files live under TTS_CACHE_DIR as <key[:2]>/<key>.wav, and the directory is
+the only shared state, so every worker on the host sees every entry. A lookup
+opens the file directly. A hit touches it, so the file's modification time is
+its recency. Size is not counted per process: at most every
+TTS_CACHE_SCAN_SECONDS, a process that has written scans the whole directory,
+and if the total is past TTS_CACHE_MAX_BYTES it deletes the least recently
+used files (oldest modification time first) until the total is back under
+the cap. Between scans the directory can overshoot by what all workers write
+in that window. Disk errors only cost the cache; speech is then synthesized
+as usual.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.translation_memory import normalize
+
+
+def speech_key(text: str, language: str, speaker: str, model: str, pace: float, sample_rate: int) -> str:
+    material = "\n".join([model, language, speaker, f"{pace:g}", str(sample_rate), normalize(text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory: str, max_bytes: int, scan_seconds: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.scan_seconds = scan_seconds
+        # What the last scan found; the directory is the source of truth
+        self._entries = 0
+        self._size = 0
+        self._last_scan = 0.0
+        self._scanning = False
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.wav")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # Recency for eviction
+        except FileNotFoundError:
+            pass  # Evicted by another worker since we opened it; the data is still good
+        return data
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp name per write: two writers of the same key never share one
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Atomic, so a concurrent reader never sees half a file
+            os.replace(temp, path)
+        finally:
+            if os.path.exists(temp):
+                os.unlink(temp)
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every entry, least recently used first."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".wav"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        entries.sort()
+        return entries
+
+    def _enforce_limit(self) -> int:
+        """Scan the directory and evict down to max_bytes. Returns the number of files removed."""
+        entries = self._scan()
+        size = sum(entry[1] for entry in entries)
+        evicted = 0
+        for _, file_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass  # Another worker got there first
+            size -= file_size
+        self._entries = len(entries) - evicted
+        self._size = size
+        return evicted
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            data = await asyncio.to_thread(self._read, key)
+        except OSError as e:
+            print(f"TTS Cache: Read failed: {e}")
+            self.stats["errors"] += 1
+            data = None
+        if data:
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(data)
+            return data
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, key: str, data: bytes):
+        if not data or len(data) > self.max_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, data)
+        except OSError as e:
+            print(f"TTS Cache: Write failed: {e}")
+            self.stats["errors"] += 1
+            return
+        self.stats["writes"] += 1
+
+        if self._scanning or time.monotonic() - self._last_scan < self.scan_seconds:
+            return
+        self._scanning = True
+        try:
+            self.stats["evictions"] += await asyncio.to_thread(self._enforce_limit)
+        except OSError as e:
+            print(f"TTS Cache: Eviction scan failed: {e}")
+            self.stats["errors"] += 1
+        finally:
+            self._last_scan = time.monotonic()
+            self._scanning = False
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            # As of this process's last scan
+            "entries": self._entries,
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+tts_cache = TTSCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES, settings.TTS_CACHE_SCAN_SECONDS)
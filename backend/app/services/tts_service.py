@@ -0,0 +1,224 @@
+"""
+Sentence-chunked text-to-speech on Sarvam Bulbul.
+
+Long text is split on sentence boundaries (Latin `.!?`, Devanagari `।` `॥`,
+Urdu `۔` `؟`, line breaks) into chunks of at most TTS_CHUNK_MAX_CHARS. The
+chunks are synthesized concurrently, at most TTS_PARALLEL_CHUNKS at a time per
+request (and within the Sarvam provider limit overall), and handed out in
+order as soon as each one and those before it are ready. The first sentence
+can be playing while the rest are still being synthesized.
+
+Outputs:
+- stream(): one WAV for chunked HTTP responses. The header carries the
+  "unknown length" sizes used for streamed WAV, followed by raw PCM from
+  each chunk.
+- chunks(): one self-contained WAV per chunk, for WebSocket clients.
+- synthesize(): the whole text as a single WAV, for callers that need bytes.
+
+Chunks already in the TTS cache (tts_cache.py) are served from disk without
+calling Bulbul. A chunk that fails is retried once. If it fails again, the
+whole synthesis fails with SpeechFailed: a clip is never spliced together
+around a missing sentence.
+"""
+import asyncio
+import base64
+import io
+import re
+import struct
+import wave
+from typing import AsyncIterator, List, Tuple
+
+from app.core.config import settings
+from app.services.resilience import providers
+from app.services.sarvam_client import sarvam_client
+from app.services.tts_cache import speech_key, tts_cache
+
+# Sentence ends: Latin punctuation followed by space, danda/double danda,
+# Urdu full stop and question mark, and line breaks
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[।॥۔؟])\s*|\n+")
+# Where to break a sentence that is longer than one chunk
+CLAUSE_END = re.compile(r"(?<=[,;:،])\s+")
+
+WavParams = Tuple[int, int, int]  # channels, sample width (bytes), frame rate
+CHUNK_ATTEMPTS = 2
+RETRY_DELAY = 0.5
+
+
+class SpeechFailed(Exception):
+    """A chunk could not be synthesized, so the clip would have a gap."""
+
+
+def split_sentences(text: str, max_chars: int) -> List[str]:
+    """Sentences of `text`, packed into chunks of at most `max_chars` characters."""
+    pieces: List[str] = []
+    for sentence in SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        # Too long for one request: break at clauses, then at words
+        for clause in CLAUSE_END.split(sentence):
+            while len(clause) > max_chars:
+                cut = clause.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(clause[:cut].strip())
+                clause = clause[cut:].strip()
+            if clause:
+                pieces.append(clause)
+
+    # Merge short neighbours into fuller chunks, except the first sentence: it
+    # stays on its own so the first audio is back as early as possible
+    chunks: List[str] = []
+    for piece in pieces:
+        if len(chunks) > 1 and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def read_wav(data: bytes) -> Tuple[WavParams, bytes]:
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()), wav.readframes(wav.getnframes())
+
+
+def write_wav(params: WavParams, frames: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(params[0])
+        wav.setsampwidth(params[1])
+        wav.setframerate(params[2])
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def stream_header(params: WavParams) -> bytes:
+    """RIFF/WAVE header for a stream whose length is not known up front."""
+    channels, width, rate = params
+    unknown = 0xFFFFFFFF
+    return (
+        b"RIFF" + struct.pack("<I", unknown) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, rate, rate * channels * width, channels * width, width * 8)
+        + b"data" + struct.pack("<I", unknown)
+    )
+
+
+class TTSService:
+    def __init__(self):
+        self.api_key = settings.SARVAM_API_KEY
+        self.api_url = "https://api.sarvam.ai/text-to-speech"
+        self.model = "bulbul:v2"
+        self.pace = 1.0
+        self.sample_rate = 22050
+        self.max_chars = settings.TTS_CHUNK_MAX_CHARS
+        self.parallel = settings.TTS_PARALLEL_CHUNKS
+        self._guard = providers["sarvam"]
+
+    async def _request_speech(self, text: str, target_language: str, speaker: str) -> bytes:
+        """One Bulbul call for one chunk. Returns WAV bytes; raises on HTTP or network errors."""
+        headers = {
+            "api-subscription-key": self.api_key,
+            "content-type": "application/json"
+        }
+
+        payload = {
+            "inputs": [text],
+            "target_language_code": target_language,
+            "speaker": speaker,
+            "pitch": 0,
+            "pace": self.pace,
+            "loudness": 1.5,
+            "speech_sample_rate": self.sample_rate,
+            "enable_preprocessing": True,
+            "model": self.model
+        }
+
+        async with self._guard.slot():
+            response = await sarvam_client.client.post(self.api_url, headers=headers, json=payload)
+            response.raise_for_status()
+        audios = response.json().get("audios") or []
+        return base64.b64decode(audios[0]) if audios else b""
+
+    async def _speech_chunk(self, text: str, target_language: str, speaker: str) -> Tuple[WavParams, bytes]:
+        """PCM for one chunk, retried once; raises SpeechFailed if it still fails."""
+        key = speech_key(text, target_language, speaker, self.model, self.pace, self.sample_rate)
+        wav = await tts_cache.get(key)
+        if wav is not None:
+            return read_wav(wav)
+
+        for attempt in range(1, CHUNK_ATTEMPTS + 1):
+            try:
+                wav = await self._request_speech(text, target_language, speaker)
+                if not wav:
+                    raise ValueError("no audio in response")
+                params_frames = read_wav(wav)
+            except Exception as e:
+                print(f"Sarvam TTS Error on chunk ({len(text)} chars), attempt {attempt}: {e}")
+                if attempt == CHUNK_ATTEMPTS:
+                    raise SpeechFailed(str(e)) from e
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            await tts_cache.put(key, wav)
+            return params_frames
+
+    async def _pcm_in_order(self, text: str, target_language: str, speaker: str) -> AsyncIterator[Tuple[WavParams, bytes]]:
+        """
+        Synthesize all chunks concurrently, yield them in text order as they
+        become ready. Raises SpeechFailed at the first chunk that fails.
+        """
+        chunks = split_sentences(text, self.max_chars)
+        limit = asyncio.Semaphore(self.parallel)
+
+        async def synthesize(chunk: str):
+            async with limit:
+                return await self._speech_chunk(chunk, target_language, speaker)
+
+        # The semaphore wakes waiters in order, so earlier chunks are requested first
+        tasks = [asyncio.ensure_future(synthesize(chunk)) for chunk in chunks]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            # Client went away or the caller stopped early: drop the remaining requests
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, text: str, target_language: str = "en-IN", speaker: str = "anushka") -> AsyncIterator[bytes]:
+        """
+        A single streamed WAV: header with the first chunk, then raw PCM per
+        chunk. Raises SpeechFailed, ending the stream early, if a chunk fails.
+        """
+        params = None
+        async for chunk_params, frames in self._pcm_in_order(text, target_language, speaker):
+            if params is None:
+                params = chunk_params
+                yield stream_header(params) + frames
+            elif chunk_params == params:
+                yield frames
+            else:
+                raise SpeechFailed(f"chunk format {chunk_params} differs from {params}")
+
+    async def chunks(self, text: str, target_language: str = "en-IN", speaker: str = "anushka") -> AsyncIterator[bytes]:
+        """One self-contained WAV per chunk, in order."""
+        async for params, frames in self._pcm_in_order(text, target_language, speaker):
+            yield write_wav(params, frames)
+
+    async def synthesize(self, text: str, target_language: str = "en-IN", speaker: str = "anushka") -> bytes:
+        """The whole text as one WAV (chunks still synthesized in parallel); b"" on failure."""
+        params, frames = None, []
+        try:
+            async for chunk_params, chunk_frames in self._pcm_in_order(text, target_language, speaker):
+                if params is None:
+                    params = chunk_params
+                if chunk_params != params:
+                    raise SpeechFailed(f"chunk format {chunk_params} differs from {params}")
+                frames.append(chunk_frames)
+        except SpeechFailed as e:
+            print(f"Sarvam TTS: Giving up on the clip: {e}")
+            return b""
+        return write_wav(params, b"".join(frames)) if params else b""
+
+
+tts_service = TTSService()
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import auth, endpoints
@@ -6,15 +7,31 @@ from app.db import init_db
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from app.services.news_service import news_service
+from app.services.sarvam_client import sarvam_client
+from app.services.openai_client import openai_client
+from app.services.analysis_jobs import analysis_jobs
+from app.services.history_writer import history_writer
+from app.services.resilience import ProviderUnavailable
 
 app = FastAPI(title="Cropic API")
 
+@app.exception_handler(ProviderUnavailable)
+async def provider_unavailable_handler(request: Request, exc: ProviderUnavailable):
+    # An upstream provider is degraded or saturated: fail fast, let the client retry
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Service temporarily unavailable: {exc}"},
+        headers={"Retry-After": str(int(settings.CIRCUIT_RESET_SECONDS))},
+    )
+
 # Initialize Scheduler
 scheduler = AsyncIOScheduler()
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await history_writer.start()
+    await analysis_jobs.start()
     
     # Schedule weekly news broadcast (e.g., every Monday at 9:00 AM)
     # For testing purposes, we can also trigger it manually via endpoint
@@ -22,6 +39,13 @@ async def on_startup():
     # scheduler.start()
     # print("Scheduler started: Weekly agricultural updates scheduled for Monday 9:00 AM.")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await analysis_jobs.stop()
+    await history_writer.stop()
+    await sarvam_client.close()
+    await openai_client.close()
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,18 @@
+"""
+Settings are read from the environment when app modules are imported, so the
+required keys get placeholder values here, before any test imports the app.
+Nothing in these tests talks to the real providers or database.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix="cropic-tests-")
+os.environ.setdefault("SARVAM_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("PREDICTION_LAZY_LOADING", "true")
+os.environ.setdefault("MODEL_ARTIFACT_DIR", os.path.join(_scratch, "artifacts"))
+os.environ.setdefault("TTS_CACHE_DIR", os.path.join(_scratch, "tts-cache"))
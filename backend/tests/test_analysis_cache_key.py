@@ -0,0 +1,46 @@
+from app.models import UserInput
+from app.services.analysis_service import AnalysisService, age_bucket, language_key
+
+
+def _key(user_input, context):
+    return AnalysisService.cache_key(user_input, context)[0]
+
+
+BASE = UserInput(location="Dharwad", land_size="2 acres", previous_crops="Cotton", language="kn")
+CONTEXT = {"full_name": "Ravi", "age": 34, "gender": "Male", "caste_category": "OBC"}
+
+
+def test_formatting_differences_share_a_key():
+    variant = UserInput(location="  dharwad. ", land_size="2  ACRES", previous_crops="cotton", language="kn")
+    assert _key(variant, CONTEXT) == _key(BASE, CONTEXT)
+
+
+def test_language_spelling_shares_a_key():
+    assert _key(BASE.model_copy(update={"language": " KN "}), CONTEXT) == _key(BASE, CONTEXT)
+    english = [_key(BASE.model_copy(update={"language": code}), CONTEXT) for code in ("en", "en-IN", "EN_in", "")]
+    assert len(set(english)) == 1
+    assert language_key("hi-IN") == "hi-in"
+    assert language_key(None) == "en"
+
+
+def test_name_and_exact_age_do_not_change_the_key():
+    other = {**CONTEXT, "full_name": "Someone else", "age": 39}
+    assert _key(BASE, other) == _key(BASE, CONTEXT)
+
+
+def test_inputs_that_change_the_report_change_the_key():
+    assert _key(BASE.model_copy(update={"language": "hi"}), CONTEXT) != _key(BASE, CONTEXT)
+    assert _key(BASE.model_copy(update={"previous_crops": "Paddy"}), CONTEXT) != _key(BASE, CONTEXT)
+    assert _key(BASE, {**CONTEXT, "age": 45}) != _key(BASE, CONTEXT)
+    assert _key(BASE, {**CONTEXT, "caste_category": "SC"}) != _key(BASE, CONTEXT)
+
+
+def test_shared_context_carries_no_personal_details():
+    _, shared = AnalysisService.cache_key(BASE, CONTEXT)
+    assert shared == {"full_name": "", "age": "30-39", "gender": "male", "caste_category": "obc"}
+
+
+def test_age_bucket():
+    assert age_bucket(None) == "Not specified"
+    assert age_bucket(0) == "Not specified"
+    assert age_bucket(40) == "40-49"
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+from beanie import init_beanie  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models import AnalysisJob  # noqa: E402
+from app.services import analysis_jobs as module  # noqa: E402
+from app.services.analysis_jobs import AnalysisJobQueue  # noqa: E402
+
+USER_INPUT = {"location": "Dharwad", "land_size": "2 acres", "previous_crops": "Cotton", "language": "en"}
+REPORT = {
+    "soil_type": "Black",
+    "recommended_crops": ["Cotton"],
+    "weather_analysis": "Dry",
+    "price_prediction": "Stable",
+    "detailed_advice": "Sow early.",
+}
+
+
+def run(test):
+    """Run `test` against a fresh in-memory database."""
+    async def main():
+        await init_beanie(database=mongomock_motor.AsyncMongoMockClient()["jobs"], document_models=[AnalysisJob])
+        await test()
+    asyncio.run(main())
+
+
+async def _job(**fields) -> AnalysisJob:
+    fields.setdefault("updated_at", datetime.now())
+    job = AnalysisJob(user_email="farmer@example.com", user_input=USER_INPUT, user_context={}, **fields)
+    await job.insert()
+    return job
+
+
+def _queue() -> AnalysisJobQueue:
+    queue = AnalysisJobQueue(workers=1, max_queued=10)
+    queue._queue = asyncio.Queue(maxsize=queue.max_queued)
+    return queue
+
+
+@pytest.fixture
+def analyses(monkeypatch):
+    """Replaces the analysis with a stub; the list records each call, the event releases them."""
+    calls, release = [], asyncio.Event()
+
+    async def analyze_shared(user_input, user_context):
+        calls.append(user_input)
+        await release.wait()
+        return REPORT, False, "MISS"
+
+    monkeypatch.setattr(module.analysis_service, "analyze_shared", analyze_shared)
+    return calls, release
+
+
+def test_a_job_is_claimed_by_one_process_only(analyses):
+    calls, release = analyses
+
+    async def test():
+        job = await _job()
+        release.set()
+        # Two processes pick the same job off their queues at once
+        await asyncio.gather(_queue()._run(str(job.id)), _queue()._run(str(job.id)))
+
+        stored = await AnalysisJob.get(job.id)
+        assert len(calls) == 1
+        assert (stored.status, stored.attempts) == ("done", 1)
+        assert stored.result["soil_type"] == "Black"
+
+    run(test)
+
+
+def test_sweep_releases_expired_leases_only(analyses):
+    async def test():
+        expired = await _job(status="running", attempts=1, updated_at=datetime.now() - timedelta(hours=1))
+        alive = await _job(status="running", attempts=1)
+        queue = _queue()
+
+        await queue._sweep()
+
+        assert (await AnalysisJob.get(expired.id)).status == "queued"
+        assert (await AnalysisJob.get(alive.id)).status == "running"
+        assert queue._queue.get_nowait() == str(expired.id)
+        assert queue._queue.empty()
+
+    run(test)
+
+
+def test_startup_sweep_takes_every_queued_job_once(analyses):
+    async def test():
+        jobs = [await _job() for _ in range(3)]
+        queue = _queue()
+
+        await queue._sweep(everything=True)
+        await queue._sweep(everything=True)  # Already on this queue: not added twice
+
+        assert queue.depth() == 3
+        assert {queue._queue.get_nowait() for _ in jobs} == {str(job.id) for job in jobs}
+
+    run(test)
+
+
+def test_job_fails_after_too_many_interruptions(analyses):
+    async def test():
+        job = await _job(attempts=settings.ANALYSIS_JOB_MAX_ATTEMPTS, updated_at=None)
+        queue = _queue()
+
+        await queue._sweep()
+
+        stored = await AnalysisJob.get(job.id)
+        assert stored.status == "failed"
+        assert queue._queue.empty()
+
+    run(test)
+
+
+def test_stop_hands_running_jobs_back(analyses):
+    calls, _ = analyses
+
+    async def test():
+        job = await _job()
+        queue = _queue()
+        queue._tasks = [asyncio.create_task(queue._run(str(job.id)))]
+        while not calls:
+            await asyncio.sleep(0.01)
+
+        await queue.stop()
+
+        stored = await AnalysisJob.get(job.id)
+        assert (stored.status, stored.attempts, stored.updated_at) == ("queued", 0, None)
+
+    run(test)
+
+
+def test_outcome_is_dropped_once_the_lease_is_lost(analyses):
+    calls, release = analyses
+
+    async def test():
+        job = await _job()
+        run_task = asyncio.create_task(_queue()._run(str(job.id)))
+        while not calls:
+            await asyncio.sleep(0.01)
+
+        # The lease expired and another process claimed the job again
+        await AnalysisJob.find_one(AnalysisJob.id == job.id).update({"$set": {"attempts": 2}})
+        release.set()
+        await run_task
+
+        stored = await AnalysisJob.get(job.id)
+        assert (stored.status, stored.result) == ("running", None)
+
+    run(test)
@@ -0,0 +1,39 @@
+import pytest
+
+from app.services.audio_store import AudioStore, RangeNotSatisfiable, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    (" bytes=5-5 ", (5, 5)),
+    # Ignored rather than refused: malformed, empty and multi-range headers
+    ("bytes=-", None),
+    ("items=0-10", None),
+    ("bytes=0-10,20-30", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1200", "bytes=50-10"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+def test_negotiate_prefers_the_query_then_accept():
+    store = AudioStore(ttl_seconds=60)
+    store.ffmpeg = "/usr/bin/ffmpeg"
+    assert store.negotiate("mp3", "audio/ogg") == "mp3"
+    assert store.negotiate(None, "audio/ogg;codecs=opus, */*") == "opus"
+    assert store.negotiate("flac", "audio/mpeg") == "mp3"
+    assert store.negotiate(None, "*/*") == "wav"
+
+    store.ffmpeg = None
+    assert store.negotiate("opus", "audio/ogg") == "wav"
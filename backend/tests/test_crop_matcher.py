@@ -0,0 +1,31 @@
+import pytest
+
+from app.services.crop_matcher import crop_matcher
+
+
+@pytest.mark.parametrize("text, crops", [
+    ("I grew wheat and paddy last year", ["wheat", "paddy"]),
+    ("Tomatoes and lentils", ["masoor"]),
+    ("red gram after maize", ["arhar", "maize"]),
+    ("गेहूंकी फसल", ["wheat"]),
+    ("ಭತ್ತವನ್ನು ಬೆಳೆದಿದ್ದೇನೆ", ["paddy"]),
+    ("వరిని పండించాను", ["paddy"]),
+])
+def test_finds_crops_in_order(text, crops):
+    assert crop_matcher.find_all(text) == crops
+
+
+@pytest.mark.parametrize("text", [
+    "जौनपुर",  # starts with जौ (barley)
+    "तिलहन",  # starts with तिल (sesamum)
+    "मैं सोया था",  # "I slept", not soyabean
+    "grammar",
+    "programme",
+    "",
+])
+def test_no_match_inside_longer_words(text):
+    assert crop_matcher.find_all(text) == []
+
+
+def test_reports_each_crop_once():
+    assert crop_matcher.find_all("wheat, more wheat, गेहूं") == crop_matcher.find_all("wheat")
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+from beanie import init_beanie  # noqa: E402
+
+from app.models import ChatSession  # noqa: E402
+from app.services.history_writer import HistoryWriter  # noqa: E402
+
+
+def run(test):
+    async def main():
+        await init_beanie(database=mongomock_motor.AsyncMongoMockClient()["history"], document_models=[ChatSession])
+        # A flusher that misses its cancellation would otherwise hang the suite
+        await asyncio.wait_for(test(), 10)
+    asyncio.run(main())
+
+
+def _session(i: int) -> ChatSession:
+    return ChatSession(user_email="farmer@example.com", title=f"Chat {i}", messages=[])
+
+
+def _writer(**overrides) -> HistoryWriter:
+    options = {"batch_size": 50, "flush_interval": 60.0, "max_queued": 100, "max_retries": 0}
+    options.update(overrides)
+    return HistoryWriter(**options)
+
+
+def test_stop_flushes_a_batch_that_is_still_filling():
+    async def test():
+        writer = _writer()
+        await writer.start()
+        for i in range(3):
+            writer.submit(_session(i))
+        # Let the flusher take the documents off the queue and wait for more
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert writer.depth() == 0
+
+        await writer.stop()
+
+        assert await ChatSession.count() == 3
+        assert (writer.stats["written"], writer.stats["dropped"]) == (3, 0)
+
+    run(test)
+
+
+def test_full_batches_are_written_with_one_insert():
+    async def test():
+        writer = _writer(batch_size=2)
+        await writer.start()
+        for i in range(4):
+            writer.submit(_session(i))
+        while writer.stats["written"] < 4:
+            await asyncio.sleep(0.01)
+        await writer.stop()
+
+        assert writer.stats["batches"] == 2
+        assert await ChatSession.count() == 4
+
+    run(test)
+
+
+def test_direct_writes_finish_before_stop_returns():
+    async def test():
+        writer = _writer()  # Never started: every submit writes on its own
+        writer.submit(_session(1))
+        writer.submit(_session(2))
+        await writer.stop()
+
+        assert writer.stats["direct"] == 2
+        assert await ChatSession.count() == 2
+
+    run(test)
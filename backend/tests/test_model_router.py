@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.services.model_router import ModelRouter, Route
+
+
+def _router():
+    return ModelRouter({"chat": Route(["primary", "fallback"], budget=5.0, hedge_after=1.0)})
+
+
+def _collect(router, open_stream):
+    async def collect():
+        return [text async for text in router.stream("chat", open_stream)]
+    return asyncio.run(collect())
+
+
+def test_stream_falls_back_when_the_primary_fails_before_output():
+    router = _router()
+
+    async def open_stream(model):
+        if model == "primary":
+            raise ConnectionError("refused")
+        yield "Hello"
+        yield None
+        yield " farmer"
+
+    assert _collect(router, open_stream) == ["Hello", " farmer"]
+    stats = router.stats()["models"]
+    assert (stats["primary"]["errors"], stats["fallback"]["wins"]) == (1, 1)
+
+
+def test_stream_keeps_partial_output_when_it_breaks_off():
+    router = _router()
+    opened = []
+
+    async def open_stream(model):
+        opened.append(model)
+        yield "Partial"
+        raise ConnectionError("reset")
+
+    assert _collect(router, open_stream) == ["Partial"]
+    assert opened == ["primary"]
+
+
+def test_stream_raises_when_no_model_produces_output():
+    async def open_stream(model):
+        raise ConnectionError(model)
+        yield  # pragma: no cover
+
+    with pytest.raises(ConnectionError, match="fallback"):
+        _collect(_router(), open_stream)
+
+
+def test_stopping_early_closes_the_provider_stream():
+    router = _router()
+    closed = []
+
+    async def open_stream(model):
+        try:
+            yield "one"
+            yield "two"
+        finally:
+            closed.append(model)
+
+    async def first_only():
+        stream = router.stream("chat", open_stream)
+        async for text in stream:
+            await stream.aclose()
+            return text
+
+    assert asyncio.run(first_only()) == "one"
+    assert closed == ["primary"]
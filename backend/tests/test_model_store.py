@@ -0,0 +1,47 @@
+import numpy as np
+from sklearn.tree import DecisionTreeRegressor
+
+from app.services.model_store import ModelStore
+
+
+def _fitted_tree():
+    X = np.arange(40, dtype=float).reshape(-1, 2)
+    y = X[:, 0] * 3 + X[:, 1]
+    return DecisionTreeRegressor(max_depth=4, random_state=0).fit(X, y), X
+
+
+def test_save_then_load_round_trips(tmp_path):
+    store = ModelStore(str(tmp_path))
+    model, X = _fitted_tree()
+    key = store.artifact_key("Wheat", "data-hash", {"max_depth": 4})
+
+    assert not store.exists(key)
+    store.save(key, model)
+    assert store.exists(key)
+
+    loaded = store.load(key)
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(X))
+
+
+def test_save_leaves_no_temp_files(tmp_path):
+    store = ModelStore(str(tmp_path))
+    model, _ = _fitted_tree()
+    key = store.artifact_key("Wheat", "data-hash", {})
+    store.save(key, model)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{key}.joblib"]
+
+
+def test_load_missing_or_corrupt_returns_none(tmp_path):
+    store = ModelStore(str(tmp_path))
+    assert store.load("absent") is None
+
+    (tmp_path / "broken.joblib").write_bytes(b"not a pickle")
+    assert store.load("broken") is None
+
+
+def test_key_changes_with_data_and_params():
+    key = ModelStore.artifact_key("Wheat", "hash-a", {"max_depth": 4})
+    assert key.startswith("wheat-")
+    assert key == ModelStore.artifact_key("Wheat", "hash-a", {"max_depth": 4})
+    assert key != ModelStore.artifact_key("Wheat", "hash-b", {"max_depth": 4})
+    assert key != ModelStore.artifact_key("Wheat", "hash-a", {"max_depth": 5})
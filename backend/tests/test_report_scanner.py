@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from app.services import analysis_service as module
+from app.services.analysis_service import ReportScanner, analysis_service
+
+REPORT = {
+    "soil_type": "Black cotton soil",
+    "recommended_crops": ["Cotton", "Soyabean"],
+    "weather_analysis": "A \"good\" monsoon, then dry",
+    "price_prediction": "Stable",
+    "detailed_advice": "Sow early.",
+}
+
+
+def _feed_in_chunks(text, size):
+    scanner = ReportScanner()
+    completed = []
+    for end in range(size, len(text) + size, size):
+        completed.extend(scanner.feed(text[:end]))
+    return scanner, completed
+
+
+def test_fields_complete_in_report_order_as_text_grows():
+    text = json.dumps(REPORT)
+    scanner, completed = _feed_in_chunks(text, 7)
+    assert completed == [(field, REPORT[field]) for field in REPORT]
+    assert scanner.found == REPORT
+
+
+def test_unfinished_value_is_not_reported():
+    scanner = ReportScanner()
+    assert scanner.feed('{"soil_type": "Black cot') == []
+    assert scanner.feed('{"soil_type": "Black cotton soil", "recommended_crops": ["Cot') == [("soil_type", "Black cotton soil")]
+
+
+def test_each_field_is_reported_once():
+    scanner = ReportScanner()
+    text = '{"soil_type": "Loam", '
+    assert scanner.feed(text) == [("soil_type", "Loam")]
+    assert scanner.feed(text + '"price_prediction": "Up"}') == [("price_prediction", "Up")]
+
+
+def test_number_at_the_end_waits_for_more_text():
+    scanner = ReportScanner(fields=("score",))
+    assert scanner.feed('{"score": 4') == []
+    assert scanner.feed('{"score": 42}') == [("score", 42)]
+
+
+def test_failed_section_translation_keeps_the_english_text(monkeypatch):
+    async def failing(texts, language):
+        raise RuntimeError("Sarvam is down")
+
+    monkeypatch.setattr(module.sarvam_service, "translate_batch", failing)
+    result = asyncio.run(analysis_service._translate_or_keep("soil_type", "Loam", "hi"))
+    assert result == "Loam"
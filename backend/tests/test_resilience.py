@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.services.resilience import CircuitOpen, ProviderBusy, ProviderGuard, is_provider_failure, raise_for_provider_status
+
+REQUEST = httpx.Request("GET", "https://provider.example")
+
+
+def _status_error(status):
+    return httpx.HTTPStatusError("error", request=REQUEST, response=httpx.Response(status, request=REQUEST))
+
+
+def _guard(**overrides):
+    options = {"max_concurrency": 2, "failure_threshold": 2, "reset_seconds": 0.05, "queue_timeout": 0.05}
+    options.update(overrides)
+    return ProviderGuard("test", **options)
+
+
+async def _call(guard, error=None):
+    async with guard.slot():
+        if error is not None:
+            raise error
+
+
+async def _fail(guard, error):
+    with pytest.raises(type(error)):
+        await _call(guard, error)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (asyncio.TimeoutError(), True),
+    (httpx.ConnectTimeout("timeout"), True),
+    (httpx.ConnectError("refused"), True),
+    (openai.APITimeoutError(request=REQUEST), True),
+    (_status_error(503), True),
+    (_status_error(429), True),
+    (_status_error(400), False),
+    (_status_error(404), False),
+    (KeyError("text"), False),
+    (ValueError("bad json"), False),
+])
+def test_is_provider_failure(error, expected):
+    assert is_provider_failure(error) is expected
+
+
+def test_circuit_opens_after_consecutive_failures_then_probes():
+    async def test():
+        guard = _guard()
+        await _fail(guard, _status_error(502))
+        assert guard.state == "closed"
+        await _fail(guard, _status_error(502))
+        assert guard.state == "open"
+
+        # Fails fast without reaching the provider while open
+        with pytest.raises(CircuitOpen):
+            await _call(guard)
+
+        # After the reset window a single probe decides; a success closes it
+        await asyncio.sleep(0.06)
+        await _call(guard)
+        assert guard.state == "closed"
+        assert guard.snapshot()["opened"] == 1
+
+    asyncio.run(test())
+
+
+def test_failed_probe_reopens_the_circuit():
+    async def test():
+        guard = _guard(failure_threshold=1)
+        await _fail(guard, httpx.ConnectError("refused"))
+        await asyncio.sleep(0.06)
+        await _fail(guard, httpx.ConnectError("refused"))
+        assert guard.state == "open"
+        with pytest.raises(CircuitOpen):
+            await _call(guard)
+
+    asyncio.run(test())
+
+
+def test_only_one_probe_at_a_time():
+    async def test():
+        guard = _guard(failure_threshold=1)
+        await _fail(guard, _status_error(500))
+        await asyncio.sleep(0.06)
+
+        release = asyncio.Event()
+
+        async def probe():
+            async with guard.slot():
+                await release.wait()
+
+        probing = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        assert guard.state == "half_open"
+        with pytest.raises(CircuitOpen):
+            await _call(guard)
+        release.set()
+        await probing
+        assert guard.state == "closed"
+
+    asyncio.run(test())
+
+
+def test_client_errors_and_successes_keep_it_closed():
+    async def test():
+        guard = _guard(failure_threshold=2)
+        await _fail(guard, _status_error(500))
+        await _fail(guard, _status_error(400))  # Our fault: resets the streak
+        await _fail(guard, _status_error(500))
+        assert guard.state == "closed"
+
+    asyncio.run(test())
+
+
+def test_sheds_calls_that_cannot_get_a_slot():
+    async def test():
+        guard = _guard(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with guard.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(ProviderBusy):
+            await _call(guard)
+        assert guard.snapshot()["rejected_busy"] == 1
+        release.set()
+        await holder
+        assert (guard.in_flight, guard.waiting) == (0, 0)
+
+    asyncio.run(test())
+
+
+def test_min_interval_spaces_call_starts():
+    async def test():
+        guard = _guard(max_concurrency=1, queue_timeout=1.0, min_interval=0.05)
+        starts = []
+
+        async def call():
+            async with guard.slot():
+                starts.append(time.monotonic())
+
+        await asyncio.gather(*(call() for _ in range(3)))
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        assert all(gap >= 0.045 for gap in gaps)
+
+    asyncio.run(test())
+
+
+@pytest.mark.parametrize("status, raises", [(200, False), (404, False), (429, True), (503, True)])
+def test_raise_for_provider_status(status, raises):
+    response = httpx.Response(status, request=REQUEST)
+    if raises:
+        with pytest.raises(httpx.HTTPStatusError):
+            raise_for_provider_status(response)
+    else:
+        raise_for_provider_status(response)
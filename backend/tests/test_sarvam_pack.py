@@ -0,0 +1,29 @@
+from app.services.sarvam_service import SarvamService
+
+
+def _service(max_chars):
+    service = SarvamService()
+    service.max_chars = max_chars
+    return service
+
+
+def test_packs_short_segments_under_the_limit():
+    packs = _service(12)._pack(["aaa", "bbb", "ccc", "ddddd"])
+    # Each segment counts its joining newline: 3 packed segments fill 12 chars
+    assert packs == [["aaa", "bbb", "ccc"], ["ddddd"]]
+    assert all(len("\n".join(pack)) <= 12 for pack in packs)
+
+
+def test_multiline_and_oversized_segments_travel_alone():
+    packs = _service(10)._pack(["a", "two\nlines", "b", "x" * 11, "c"])
+    assert packs == [["two\nlines"], ["x" * 11], ["a", "b", "c"]]
+
+
+def test_order_is_kept_within_packs_and_nothing_is_lost():
+    segments = [f"s{i}" for i in range(20)]
+    packs = _service(9)._pack(segments)
+    assert [s for pack in packs for s in pack] == segments
+
+
+def test_empty_input():
+    assert _service(10)._pack([]) == []
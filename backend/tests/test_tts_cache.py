@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+from app.services.tts_cache import TTSCache, speech_key
+
+
+def test_key_ignores_spacing_but_not_voice():
+    key = speech_key(" Namaste  farmer ", "hi-IN", "anushka", "bulbul:v2", 1.0, 22050)
+    assert key == speech_key("Namaste farmer", "hi-IN", "anushka", "bulbul:v2", 1.0, 22050)
+    assert key != speech_key("Namaste farmer", "hi-IN", "abhilash", "bulbul:v2", 1.0, 22050)
+    assert key != speech_key("Namaste farmer", "hi-IN", "anushka", "bulbul:v2", 1.2, 22050)
+
+
+def test_workers_share_entries_through_the_directory(tmp_path):
+    async def test():
+        writer, reader = TTSCache(str(tmp_path), 1000, 0), TTSCache(str(tmp_path), 1000, 0)
+        assert await reader.get("ab12") is None
+        await writer.put("ab12", b"wav")
+        assert await reader.get("ab12") == b"wav"
+
+    asyncio.run(test())
+
+
+def test_eviction_removes_least_recently_used_files(tmp_path):
+    async def test():
+        cache = TTSCache(str(tmp_path), 250, 0)
+        for age, key in ((300, "aa1"), (200, "bb2")):
+            await cache.put(key, b"x" * 100)
+            path = cache._path(key)
+            os.utime(path, (os.path.getmtime(path) - age,) * 2)
+
+        await cache.get("aa1")  # A hit makes aa1 the most recent
+        await cache.put("cc3", b"x" * 100)
+
+        assert os.path.exists(cache._path("aa1"))
+        assert not os.path.exists(cache._path("bb2"))
+        assert cache.metrics()["size_bytes"] == 200
+
+    asyncio.run(test())
+
+
+def test_concurrent_writes_of_one_key_do_not_collide(tmp_path):
+    async def test():
+        cache = TTSCache(str(tmp_path), 10**6, 0)
+        await asyncio.gather(*(cache.put("ab12", bytes([n]) * 1000) for n in range(8)))
+        data = await cache.get("ab12")
+        assert len(data) == 1000 and len(set(data)) == 1
+        assert os.listdir(os.path.dirname(cache._path("ab12"))) == ["ab12.wav"]
+
+    asyncio.run(test())
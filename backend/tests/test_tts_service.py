@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.services import tts_service as tts_module
+from app.services.resilience import CircuitOpen, ProviderBusy
+from app.services.tts_cache import TTSCache
+from app.services.tts_service import SpeechFailed, TTSService, read_wav, split_sentences, stream_header, write_wav
+
+
+def test_splits_on_latin_and_indic_sentence_ends():
+    text = "पहली बात। दूसरी बात॥ Third one. Fourth?\nFifth"
+    assert split_sentences(text, 10) == ["पहली बात।", "दूसरी बात॥", "Third one.", "Fourth?", "Fifth"]
+
+
+def test_first_sentence_stays_alone_and_the_rest_are_merged():
+    text = "Hi. A b. C d. E f."
+    assert split_sentences(text, 12) == ["Hi.", "A b. C d.", "E f."]
+
+
+def test_long_sentences_break_at_clauses_then_words():
+    text = "one two three, four five six seven eight"
+    chunks = split_sentences(text, 12)
+    assert all(len(chunk) <= 12 for chunk in chunks)
+    assert " ".join(chunks).replace(",", "") == text.replace(",", "")
+    assert chunks[0] == "one two"
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n"])
+def test_blank_text_has_no_chunks(text):
+    assert split_sentences(text, 100) == []
+
+
+def test_wav_round_trip_and_stream_header():
+    params = (1, 2, 22050)
+    frames = b"\x01\x00" * 100
+    assert read_wav(write_wav(params, frames)) == (params, frames)
+
+    header = stream_header(params)
+    assert header[:4] == b"RIFF" and header[8:12] == b"WAVE"
+    assert len(header) == 44
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """A TTSService whose Bulbul calls are served by `responses[text]`, a list of WAVs or errors."""
+    monkeypatch.setattr(tts_module, "tts_cache", TTSCache(str(tmp_path), 10**6, 60))
+    monkeypatch.setattr(tts_module, "RETRY_DELAY", 0)
+    service = TTSService()
+    service.max_chars = 10
+    calls = []
+
+    async def request_speech(text, language, speaker):
+        calls.append(text)
+        outcome = service.responses[text].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(service, "_request_speech", request_speech)
+    service.calls = calls
+    return service
+
+
+def _wav(frames: bytes) -> bytes:
+    return write_wav((1, 2, 22050), frames)
+
+
+def test_a_failed_chunk_is_retried(service):
+    service.responses = {"One.": [_wav(b"\x01\x00")], "Two.": [ProviderBusy("busy"), _wav(b"\x02\x00")]}
+    audio = asyncio.run(service.synthesize("One. Two."))
+    assert read_wav(audio)[1] == b"\x01\x00\x02\x00"
+    assert service.calls.count("Two.") == 2
+
+
+def test_a_chunk_that_keeps_failing_fails_the_whole_clip(service):
+    service.responses = {
+        "One.": [_wav(b"\x01\x00")],
+        "Two.": [CircuitOpen("open"), CircuitOpen("open")],
+        "Three.": [_wav(b"\x03\x00")],
+    }
+    assert asyncio.run(service.synthesize("One. Two. Three.")) == b""
+
+
+def test_stream_stops_instead_of_skipping_a_sentence(service):
+    service.responses = {"One.": [_wav(b"\x01\x00")], "Two.": [CircuitOpen("open"), CircuitOpen("open")]}
+
+    async def collect():
+        received = []
+        with pytest.raises(SpeechFailed):
+            async for piece in service.stream("One. Two."):
+                received.append(piece)
+        return received
+
+    received = asyncio.run(collect())
+    assert len(received) == 1  # Header and the first sentence only
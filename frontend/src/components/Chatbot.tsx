@@ -3,12 +3,13 @@ import { useLocation, useOutletContext } from 'react-router-dom';
 
 import { Send, Bot, Loader2, Mic, MicOff, Volume2, X } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
-import api from '../services/api';
+import api, { audioSrc, chatAudio, streamChat } from '../services/api';
 
 interface Message {
     role: 'user' | 'assistant';
     content: string;
-    audio?: string;
+    audio?: string; // audio_url from the API
+    speakable?: boolean; // A completed streamed reply; speech comes from /chat/audio
 }
 
 interface UserProfile {
@@ -126,27 +127,33 @@ const Chatbot: React.FC<ChatbotProps> = ({ context, reportData, mode = 'widget'
                 }
             }
 
-            const response = await api.post('/chat', {
+            // Show the reply as it is written: the first token adds the assistant
+            // message and later ones extend it
+            let started = false;
+            const done = await streamChat({
                 message: userMessage,
                 context: analysisContext,
                 history: history
+            }, (text) => {
+                const firstToken = !started;
+                started = true;
+                setMessages(prev => {
+                    if (firstToken) return [...prev, { role: 'assistant', content: text }];
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+                });
             });
 
-            // Use TTS audio from chat response if available
-            const audioB64 = response.data.audio || '';
-
-            setMessages(prev => [...prev, {
-                role: 'assistant',
-                content: response.data.response,
-                audio: audioB64 || undefined
-            }]);
+            // The full reply replaces the streamed text, and can now be spoken
+            const reply = { role: 'assistant' as const, content: done.response, speakable: true };
+            setMessages(prev => started ? [...prev.slice(0, -1), reply] : [...prev, reply]);
 
             // Save messages to existing session if loaded from history
             if (currentSessionId) {
                 try {
                     await api.post(`/chat/update/${currentSessionId}`, [
                         { role: 'user', content: userMessage },
-                        { role: 'assistant', content: response.data.response }
+                        { role: 'assistant', content: done.response }
                     ]);
                 } catch (error) {
                     console.error('Error saving to chat session:', error);
@@ -272,18 +279,13 @@ const Chatbot: React.FC<ChatbotProps> = ({ context, reportData, mode = 'widget'
         }
     };
 
-    const playAudio = (base64Audio: string) => {
+    const playAudio = async (msg: Message) => {
         try {
-            const audioData = atob(base64Audio);
-            const arrayBuffer = new ArrayBuffer(audioData.length);
-            const uint8Array = new Uint8Array(arrayBuffer);
-            for (let i = 0; i < audioData.length; i++) {
-                uint8Array[i] = audioData.charCodeAt(i);
-            }
-            const blob = new Blob([uint8Array], { type: 'audio/wav' });
-            const url = URL.createObjectURL(blob);
-            const audio = new Audio(url);
-            audio.play();
+            // An audio_url is streamed from the server, so playback starts before
+            // the download finishes; a streamed reply is synthesized on demand
+            const src = msg.audio ? audioSrc(msg.audio) : await chatAudio(msg.content);
+            const audio = new Audio(src);
+            audio.play().catch(error => console.error('Audio playback error:', error));
         } catch (error) {
             console.error('Audio playback error:', error);
         }
@@ -359,9 +361,9 @@ const Chatbot: React.FC<ChatbotProps> = ({ context, reportData, mode = 'widget'
                                     >
                                         <div className="flex items-start gap-2">
                                             <span className="flex-1 whitespace-pre-wrap">{msg.content}</span>
-                                            {msg.role === 'assistant' && msg.audio && (
+                                            {msg.role === 'assistant' && (msg.audio || msg.speakable) && (
                                                 <button
-                                                    onClick={() => playAudio(msg.audio!)}
+                                                    onClick={() => playAudio(msg)}
                                                     className="p-1 hover:bg-gray-100 rounded-full flex-shrink-0"
                                                     title="Play audio"
                                                 >
@@ -372,7 +374,7 @@ const Chatbot: React.FC<ChatbotProps> = ({ context, reportData, mode = 'widget'
                                     </div>
                                 </div>
                             ))}
-                            {loading && (
+                            {loading && messages[messages.length - 1]?.role !== 'assistant' && (
                                 <div className="flex justify-start">
                                     <div className="bg-white border border-gray-200 p-3 rounded-2xl rounded-bl-none shadow-sm">
                                         <Loader2 className="w-5 h-5 animate-spin text-emerald-600" />
@@ -6,7 +6,7 @@ import ReactMarkdown from 'react-markdown';
 import html2canvas from 'html2canvas';
 import jsPDF from 'jspdf';
 import Chatbot from '../components/Chatbot';
-import api from '../services/api';
+import api, { audioSrc } from '../services/api';
 
 const Dashboard: React.FC = () => {
     const navigate = useNavigate();
@@ -83,8 +83,8 @@ const Dashboard: React.FC = () => {
                 headers: { Authorization: `Bearer ${token}` }
             });
 
-            if (response.data.audio) {
-                playAudio(response.data.audio);
+            if (response.data.audio_url) {
+                playAudio(response.data.audio_url);
             }
         } catch (error) {
             console.error('Summary failed:', error);
@@ -94,21 +94,17 @@ const Dashboard: React.FC = () => {
         }
     };
 
-    const playAudio = (base64Audio: string) => {
+    const playAudio = (audioUrl: string) => {
         try {
-            const audioData = atob(base64Audio);
-            const arrayBuffer = new ArrayBuffer(audioData.length);
-            const uint8Array = new Uint8Array(arrayBuffer);
-            for (let i = 0; i < audioData.length; i++) {
-                uint8Array[i] = audioData.charCodeAt(i);
-            }
-            const blob = new Blob([uint8Array], { type: 'audio/mpeg' });
-            const url = URL.createObjectURL(blob);
-            const audio = new Audio(url);
+            // Streamed from the server; playback starts before the download finishes
+            const audio = new Audio(audioSrc(audioUrl));
 
             setIsPlaying(true);
             audio.onended = () => setIsPlaying(false);
-            audio.play();
+            audio.play().catch(error => {
+                console.error('Audio playback error:', error);
+                setIsPlaying(false);
+            });
         } catch (error) {
             console.error('Audio playback error:', error);
             setIsPlaying(false);
@@ -31,4 +31,69 @@ export const analyzeCrops = async (data: any, token: string) => {
     return response.data;
 };
 
+// POST /chat/stream and read its Server-Sent Events: onToken gets each text delta
+// as the model writes it, and the promise resolves with the `done` event's data
+// ({ response, session_id, audio }). axios cannot stream a response body, so this
+// uses fetch with the same bearer token.
+export const streamChat = async (body: any, onToken: (text: string) => void) => {
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${API_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: JSON.stringify(body),
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Chat stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let done: any = null;
+    while (true) {
+        const { value, done: finished } = await reader.read();
+        if (finished) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line; the last piece may be incomplete
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || '';
+        for (const raw of events) {
+            let event = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+            const payload = JSON.parse(data);
+            if (event === 'token') onToken(payload.text);
+            else if (event === 'done') done = payload;
+        }
+    }
+    if (!done) {
+        throw new Error('Chat stream ended before the reply was complete');
+    }
+    return done;
+};
+
+// Speech for a reply that came from /chat/stream (which returns no audio_url),
+// as a playable object URL
+export const chatAudio = async (text: string) => {
+    const response = await api.post('/chat/audio', { text }, { responseType: 'blob' });
+    return URL.createObjectURL(response.data);
+};
+
+// Turn an audio_url from the API into a playable src, asking for Opus where the
+// browser can play it and MP3 otherwise (the server falls back to WAV)
+export const audioSrc = (audioUrl: string) => {
+    const url = new URL(audioUrl, API_URL);
+    const canPlayOpus = new Audio().canPlayType('audio/ogg; codecs=opus') !== '';
+    url.searchParams.set('format', canPlayOpus ? 'opus' : 'mp3');
+    return url.toString();
+};
+
 export default api;